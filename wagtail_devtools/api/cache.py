@@ -0,0 +1,136 @@
+"""
+An opt-in cache for the API results, enabled by naming one of the CACHES to use:
+
+    DEVTOOLS_API_CACHE = "default"
+    DEVTOOLS_API_CACHE_TIMEOUT = 60 * 60  # optional, defaults to the cache's timeout
+
+The results of each model are cached separately, under a key that includes a version
+number for the model. Saving or deleting an object, or publishing a page, bumps the
+version of its model (see signal_handlers.py) so only that model is serialized again.
+
+When caching is enabled the versions are also part of the API ETags, which catches
+updates in place that leave the row counts and highest primary keys unchanged.
+"""
+
+import hashlib
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from wagtail.models import Site
+
+from wagtail_devtools.api.conf import get_config_key
+from wagtail_devtools.api.helpers import get_host
+
+
+KEY_PREFIX = "wagtail_devtools:api"
+
+
+def get_api_cache():
+    """Return the cache to use for API results, or None if caching isn't enabled."""
+
+    if hasattr(settings, "DEVTOOLS_API_CACHE") and settings.DEVTOOLS_API_CACHE:
+        return caches[settings.DEVTOOLS_API_CACHE]
+
+
+def get_api_cache_timeout():
+    if hasattr(settings, "DEVTOOLS_API_CACHE_TIMEOUT"):
+        return settings.DEVTOOLS_API_CACHE_TIMEOUT
+    return DEFAULT_TIMEOUT
+
+
+def get_version_key(model):
+    return f"{KEY_PREFIX}:version:{model._meta.label_lower}"
+
+
+def get_model_version(cache, model):
+    key = get_version_key(model)
+    version = cache.get(key)
+    if version is None:
+        # Start from the current time so results cached under a version that has
+        # since been evicted can't be mistaken for current ones
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_model_version(model):
+    """Invalidate the cached results and ETags of a model."""
+
+    cache = get_api_cache()
+    if cache is None:
+        return
+
+    key = get_version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def get_related_models(model):
+    """Return the models whose results include objects of the model: the model, the
+    models it inherits from and the models that inherit from it."""
+
+    model = model._meta.concrete_model
+    parents = model._meta.get_parent_list()
+
+    return [
+        other
+        for other in apps.get_models()
+        if other._meta.concrete_model in parents
+        or issubclass(other._meta.concrete_model, model)
+    ]
+
+
+def get_cached_model_results(request, model, variant, build):
+    """Return the results of a model from the cache, calling build() to create and
+    cache them if they aren't cached."""
+
+    cache = get_api_cache()
+    if cache is None:
+        return build()
+
+    # Page urls depend on the sites, so they are part of every key
+    key = ":".join(
+        [
+            KEY_PREFIX,
+            "model",
+            model._meta.label_lower,
+            str(get_model_version(cache, model)),
+            str(get_model_version(cache, Site)),
+            variant,
+            get_host_key(request),
+        ]
+    )
+
+    results = cache.get(key)
+    if results is None:
+        results = build()
+        cache.set(key, results, get_api_cache_timeout())
+    return results
+
+
+def get_cached_listing_results(request, config, build):
+    """Return the results of the listing pages from the cache, calling build() to
+    create and cache them if they aren't cached."""
+
+    cache = get_api_cache()
+    if cache is None:
+        return build()
+
+    key = ":".join(
+        [KEY_PREFIX, "listing", get_config_key(config), get_host_key(request)]
+    )
+
+    results = cache.get(key)
+    if results is None:
+        results = build()
+        cache.set(key, results, get_api_cache_timeout())
+    return results
+
+
+def get_host_key(request):
+    return hashlib.md5(str(get_host(request)).encode()).hexdigest()
@@ -1,5 +1,12 @@
+import hashlib
+import json
+
 from django.apps import apps
 from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.urls import NoReverseMatch, get_urlconf, reverse
+
+from wagtail_devtools.api.helpers import get_query_list, has_admin_url_finder
 
 
 LISTING_PAGES_CONFIG = [
@@ -121,22 +128,125 @@ LISTING_PAGES_CONFIG = [
 ]
 
 
+CONFIG_FILTERS = ["app", "model", "content_type"]
+
+
 def get_listing_pages_config():
     return LISTING_PAGES_CONFIG
 
 
+# Settings the compiled configs are built from
+CONFIG_SETTINGS = [
+    "DEVTOOLS_APPS_EXCLUDE",
+    "DEVTOOLS_LISTING_EXCLUDE",
+    "INSTALLED_APPS",
+    "ROOT_URLCONF",
+]
+
+_compiled = {}
+
+
+class FrozenDict(dict):
+    """A dict that can't be changed, so a compiled config can be shared."""
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} can't be changed")
+
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+
+class FrozenList(list):
+    """A list that can't be changed, so a compiled config can be shared."""
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} can't be changed")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _immutable
+    append = clear = extend = insert = pop = remove = reverse = sort = _immutable
+
+    def __reduce__(self):
+        return type(self), (list(self),)
+
+
+def freeze(value):
+    if isinstance(value, dict):
+        return FrozenDict({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return FrozenList(freeze(item) for item in value)
+    return value
+
+
+def compile_config():
+    """Build the configs once, e.g. when the app is ready, rather than per request."""
+
+    get_wagtail_core_listing_pages_config()
+    get_wagtail_core_edit_pages_config()
+
+
+def clear_compiled_config():
+    _compiled.clear()
+
+
 def get_wagtail_core_listing_pages_config():
+    """Return the listing pages config, built once and shared, so it can't be changed.
+
+    It's built again if get_listing_pages_config() returns another list, or after
+    one of the CONFIG_SETTINGS is changed."""
+
+    source = get_listing_pages_config()
+    compiled = _compiled.get("listing")
+    if compiled is None or compiled[0] is not source:
+        compiled = (source, build_wagtail_core_listing_pages_config(source))
+        _compiled["listing"] = compiled
+    return compiled[1]
+
+
+def get_listing_urls(config):
+    """Return the (app, path) of each app in a listing pages config whose
+    listing_name resolves, and the apps whose listing_name doesn't.
+
+    The names are reversed the first time a config is used with a URLconf, and
+    the table is shared until one of the CONFIG_SETTINGS is changed."""
+
+    key = (get_config_key(config), get_urlconf() or settings.ROOT_URLCONF)
+    tables = _compiled.setdefault("listing_urls", {})
+    if key not in tables:
+        tables[key] = build_listing_urls(config)
+    return tables[key]
+
+
+def build_listing_urls(config):
+    urls = []
+    unresolved = []
+
+    for app in config["apps"]:
+        try:
+            urls.append((app, reverse(app["listing_name"])))
+        except NoReverseMatch:
+            # e.g. a page registered by hooks that aren't installed on this site
+            unresolved.append(
+                {"title": app["title"], "listing_name": app["listing_name"]}
+            )
+
+    return freeze(urls), freeze(unresolved)
+
+
+def build_wagtail_core_listing_pages_config(source):
     configuration = {
         "title": "Wagtail core listing pages",
         "apps": [],
     }
+    exclude = getattr(settings, "DEVTOOLS_LISTING_EXCLUDE", [])
 
-    for item in get_listing_pages_config():
+    for item in source:
         # if not item["listing_name"]: # TODO decide if this is required, do some testing on real data
         #     continue
-        if hasattr(settings, "DEVTOOLS_LISTING_EXCLUDE"):
-            if item["listing_name"] in settings.DEVTOOLS_LISTING_EXCLUDE:
-                continue
+        if item["listing_name"] in exclude:
+            continue
         configuration["apps"].append(
             {
                 "title": item["title"],
@@ -145,19 +255,29 @@ def get_wagtail_core_listing_pages_config():
             }
         )
 
-    return configuration
+    return compile_config_dict(configuration)
 
 
 def get_wagtail_core_edit_pages_config():
+    """Return the edit pages config, built once and shared, so it can't be changed.
+
+    It's built again after one of the CONFIG_SETTINGS is changed."""
+
+    if "edit" not in _compiled:
+        _compiled["edit"] = build_wagtail_core_edit_pages_config()
+    return _compiled["edit"]
+
+
+def build_wagtail_core_edit_pages_config():
     configuration = {
         "title": "Wagtail core edit pages",
         "apps": [],
     }
+    exclude = getattr(settings, "DEVTOOLS_APPS_EXCLUDE", [])
 
     for a in apps.get_app_configs():
-        if hasattr(settings, "DEVTOOLS_APPS_EXCLUDE"):
-            if a.name in settings.DEVTOOLS_APPS_EXCLUDE:
-                continue
+        if a.name in exclude:
+            continue
         configuration["apps"].append(
             {
                 "app_name": a.label,
@@ -165,4 +285,138 @@ def get_wagtail_core_edit_pages_config():
             }
         )
 
-    return configuration
+    return compile_config_dict(configuration, models=True)
+
+
+def compile_config_dict(configuration, models=False):
+    """Freeze a config and work out its key up front and, with models=True, the
+    model classes of an edit pages config."""
+
+    config = freeze(configuration)
+    config.key = hashlib.md5(json.dumps(config, sort_keys=True).encode()).hexdigest()
+    if models:
+        config.models = tuple(find_config_models(config))
+    return config
+
+
+def get_config_key(config):
+    """Return a hash of the config, for cache keys and ETags."""
+
+    if hasattr(config, "key"):
+        return config.key
+    return hashlib.md5(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+
+def get_request_edit_pages_config(request):
+    """Return the edit pages config narrowed by the ?app=, ?model= and ?content_type=
+    filters of the request, which may be repeated or comma separated.
+
+    Raises ValueError if a filter names an unknown app, model or content type."""
+
+    config = get_wagtail_core_edit_pages_config()
+    if request is None or not has_config_filters(request):
+        return config
+
+    return filter_edit_pages_config(
+        config,
+        app_labels=get_query_list(request, "app"),
+        model_labels=get_query_list(request, "model"),
+        content_type_ids=get_query_list(request, "content_type"),
+    )
+
+
+def has_config_filters(request):
+    return any(get_query_list(request, name) for name in CONFIG_FILTERS)
+
+
+def filter_edit_pages_config(
+    config, app_labels=None, model_labels=None, content_type_ids=None
+):
+    """Return a copy of the edit pages config with only the given apps, and only the
+    given models, as "app_label.ModelName" labels or content type ids.
+
+    Raises ValueError if a filter names an unknown app, model or content type."""
+
+    if not app_labels and not model_labels and not content_type_ids:
+        return config
+
+    for app_label in app_labels or []:
+        try:
+            apps.get_app_config(app_label)
+        except LookupError:
+            raise ValueError(f"Unknown app: {app_label}")
+
+    models = set()
+    for model_label in model_labels or []:
+        try:
+            models.add(apps.get_model(model_label))
+        except (LookupError, ValueError):
+            raise ValueError(f"Unknown model: {model_label}")
+    for content_type_id in content_type_ids or []:
+        try:
+            model = ContentType.objects.get_for_id(int(content_type_id)).model_class()
+        except (ContentType.DoesNotExist, ValueError):
+            model = None
+        if model is None:
+            raise ValueError(f"Unknown content type: {content_type_id}")
+        models.add(model)
+
+    configuration = {
+        "title": config["title"],
+        "apps": [],
+    }
+
+    for app in config["apps"]:
+        if app_labels and app["app_name"] not in app_labels:
+            continue
+        model_names = app["models"]
+        if models:
+            model_names = [
+                name
+                for name in model_names
+                if any(
+                    model._meta.app_label == app["app_name"] and model.__name__ == name
+                    for model in models
+                )
+            ]
+            if not model_names:
+                continue
+        configuration["apps"].append({**app, "models": model_names})
+
+    return compile_config_dict(configuration, models=True)
+
+
+def get_config_models(config):
+    """Return the models of the edit pages config, in the order they appear in it."""
+
+    if hasattr(config, "models"):
+        return config.models
+    return find_config_models(config)
+
+
+def find_config_models(config):
+    models = []
+
+    for app in config["apps"]:
+        for model in apps.get_app_config(app["app_name"]).get_models():
+            if "models" not in app or model.__name__ in app["models"]:
+                models.append(model)
+
+    return models
+
+
+def get_inventory_models(config):
+    """Return the models of the edit pages config that have admin edit views,
+    in the order they appear in the config."""
+
+    if hasattr(config, "inventory_models"):
+        return config.inventory_models
+
+    models = [
+        model for model in get_config_models(config) if has_admin_url_finder(model)
+    ]
+    if isinstance(config, FrozenDict):
+        # Worked out on first use, once has_admin_url_finder() has made sure the
+        # admin url finders are all registered
+        config.inventory_models = models
+    return models
@@ -1,17 +1,28 @@
 from dataclasses import dataclass, field
 
-from django.conf import settings
 from django.urls import reverse
 
-from wagtail_devtools.api.helpers import get_admin_edit_url, get_host
+from wagtail_devtools.api.helpers import SerializationContext, get_context
 
 
 @dataclass
 class ResultsModelItem:
+    """The result for an object. request may be a SerializationContext, which
+    the resolvers are then taken from."""
+
     request: object
     item: object
+    resolver: object = None
+    page_url_resolver: object = None
 
     def __post_init__(self):
+        if isinstance(self.request, SerializationContext):
+            self.context = self.request
+        else:
+            self.context = SerializationContext(
+                self.request, self.resolver, self.page_url_resolver
+            )
+
         self.title = self._title
         self.app_name = self._app_name
         self.class_name = self._class_name
@@ -20,10 +31,7 @@ class ResultsModelItem:
 
     @property
     def _title(self):
-        for key in default_field_identifier():
-            if hasattr(self.item, key):
-                return getattr(self.item, key)
-        return "Title Field not found"
+        return self.context.get_title(self.item)
 
     @property
     def _app_name(self):
@@ -35,11 +43,11 @@ class ResultsModelItem:
 
     @property
     def _editor_url(self):
-        return f"{get_admin_edit_url(self.request, self.item)}"
+        return self.context.get_edit_url(self.item)
 
     @property
     def _url(self):
-        return self.item.get_url() if hasattr(self.item, "get_url") else None
+        return self.context.get_url(self.item)
 
     def get(self):
         return {
@@ -53,18 +61,39 @@ class ResultsModelItem:
 
 @dataclass
 class Results:
+    """Results in the order they were added, without duplicates.
+
+    Results are indexed by key, the editor_url unless a key function is given,
+    so checking for a duplicate doesn't depend on the number of results."""
+
     items: list = field(default_factory=list)
+    key: object = None
+    duplicates: int = 0
+
+    def __post_init__(self):
+        self.keys = {self.get_key(item) for item in self.items}
+
+    def __len__(self):
+        return len(self.items)
+
+    def get_key(self, item):
+        if self.key:
+            return self.key(item)
+        return item.get("editor_url")
 
     def is_duplicate(self, item):
         # avoid having duplicate results
-        for i in self.items:
-            if i.get("editor_url") == item.get("editor_url"):
-                return True
-        return False
+        return self.get_key(item) in self.keys
 
     def add(self, item):
-        if not self.is_duplicate(item):
-            self.items.append(item)
+        """Add an item, returning False and counting it if it's a duplicate."""
+        key = self.get_key(item)
+        if key in self.keys:
+            self.duplicates += 1
+            return False
+        self.keys.add(key)
+        self.items.append(item)
+        return True
 
     def get(self):
         return self.items
@@ -72,8 +101,12 @@ class Results:
 
 @dataclass
 class ResultsListingItem:
+    """The result for a listing page. path is the reversed listing_name of the
+    app, reversed here if it isn't given."""
+
     request: object
     app: dict
+    path: str = None
 
     def __post_init__(self):
         self.title = self.app["title"]
@@ -86,12 +119,11 @@ class ResultsListingItem:
             "title": self.title,
             "app_name": self.app["app_name"],
             "class_name": self.class_name,
-            "editor_url": f'{get_host(self.request)}{reverse(self.app["listing_name"])}',
+            "editor_url": f"{get_context(self.request).host}{self.get_path()}",
             "url": self.url,
         }
 
-
-def default_field_identifier():
-    if hasattr(settings, "DEVTOOLS_FIELD_IDENTIFIER"):
-        return settings.DEVTOOLS_FIELD_IDENTIFIER
-    return ["title", "name", "username", "hostname"]
+    def get_path(self):
+        if self.path is None:
+            return reverse(self.app["listing_name"])
+        return self.path
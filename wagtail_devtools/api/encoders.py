@@ -0,0 +1,65 @@
+"""
+The JSON encoder for the API responses, picked with:
+
+    DEVTOOLS_JSON_BACKEND = "orjson"  # the default is "json"
+
+"json" uses the standard library with DjangoJSONEncoder. "orjson" uses orjson,
+which is much faster, if it's installed and falls back to "json" if it isn't.
+Both encode the same data to the same values, but not to the same bytes: orjson
+leaves out the spaces after separators, writes non-ASCII characters as UTF-8
+rather than escaping them, and writes some floats differently, e.g. 1e16 rather
+than 1e+16. So the backend is part of the API ETags. Compare their speed with the
+benchmark_json command of the test app.
+"""
+
+import json
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+JSON_BACKENDS = ["json", "orjson"]
+
+# Encodes what orjson doesn't, and datetimes, as DjangoJSONEncoder does
+django_encoder = DjangoJSONEncoder()
+
+
+def get_json_backend():
+    """Return the name of the JSON backend to use."""
+
+    backend = "json"
+    if hasattr(settings, "DEVTOOLS_JSON_BACKEND"):
+        backend = settings.DEVTOOLS_JSON_BACKEND
+    if backend not in JSON_BACKENDS:
+        raise ImproperlyConfigured(
+            f"DEVTOOLS_JSON_BACKEND must be one of {', '.join(JSON_BACKENDS)}"
+        )
+
+    if backend == "orjson" and orjson is None:
+        return "json"
+    return backend
+
+
+def dumps(data, backend=None):
+    """Encode data as JSON bytes with the backend, or the configured backend."""
+
+    if (backend or get_json_backend()) == "orjson":
+        return orjson.dumps(
+            data,
+            default=django_encoder.default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+    return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+
+def json_response(data, status=200):
+    """Like JsonResponse(data, safe=False), encoded with the configured backend."""
+    return HttpResponse(dumps(data), content_type="application/json", status=status)
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, Max
+from wagtail.models import Site
+
+from wagtail_devtools.api.cache import get_api_cache, get_model_version
+from wagtail_devtools.api.conf import (
+    get_config_key,
+    get_inventory_models,
+    get_request_edit_pages_config,
+    get_wagtail_core_listing_pages_config,
+    has_config_filters,
+)
+from wagtail_devtools.api.encoders import get_json_backend
+from wagtail_devtools.api.helpers import get_host, wants_ndjson
+from wagtail_devtools.api.manifest import get_manifest_path, manifest_exists
+
+
+def wagtail_core_listing_pages_etag(request):
+    """ETag for the listing pages view, which only depends on its config."""
+
+    return make_etag(request, get_config_key(get_wagtail_core_listing_pages_config()))
+
+
+def wagtail_core_apps_etag(request):
+    """ETag for the apps view, made from a cheap fingerprint of each model so that
+    unchanged results can be answered with a 304 before anything is serialized.
+
+    Page urls also depend on the sites, so the Site fingerprint is included too."""
+
+    try:
+        config = get_request_edit_pages_config(request)
+    except ValueError:
+        # The view answers invalid filters with a 400
+        return None
+
+    if request.GET.get("all") and not has_config_filters(request) and manifest_exists():
+        # Served from the manifest, which changes whenever its results do
+        return make_etag(request, os.stat(get_manifest_path()).st_mtime_ns)
+
+    fingerprints = [
+        get_model_fingerprint(model) for model in [*get_inventory_models(config), Site]
+    ]
+    return make_etag(request, get_config_key(config), fingerprints)
+
+
+def get_model_fingerprint(model):
+    """Return the label, row count, highest primary key and latest revision date of a
+    model, plus its cache version when the API cache is enabled."""
+
+    aggregates = {"count": Count("pk"), "max_pk": Max("pk")}
+    try:
+        model._meta.get_field("latest_revision_created_at")
+        aggregates["latest_revision"] = Max("latest_revision_created_at")
+    except FieldDoesNotExist:
+        pass
+
+    fingerprint = [model._meta.label_lower, model.objects.aggregate(**aggregates)]
+
+    cache = get_api_cache()
+    if cache is not None:
+        # Catches changes that don't add rows or revisions, e.g. editing a snippet.
+        # The versions are bumped by signal handlers, so the cache must be shared
+        # by every process for them to agree
+        fingerprint.append(get_model_version(cache, model))
+
+    return fingerprint
+
+
+def make_etag(request, *parts):
+    """Hash everything the response depends on into a strong ETag."""
+
+    data = [
+        get_host(request),
+        request.path,
+        sorted(request.GET.items()),
+        wants_ndjson(request),
+        # The backends encode the same results to different bytes
+        get_json_backend(),
+        *parts,
+    ]
+    return hashlib.sha1(
+        json.dumps(data, sort_keys=True, default=str).encode()
+    ).hexdigest()
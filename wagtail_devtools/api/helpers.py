@@ -1,13 +1,286 @@
-from urllib.parse import urlparse
+import asyncio
+import base64
+import binascii
+import copy
+import json
+import re
+import threading
 
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urlparse
+
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.db import connections
+from django.urls import (
+    NoReverseMatch,
+    get_script_prefix,
+    get_urlconf,
+    reverse,
+    set_script_prefix,
+    set_urlconf,
+)
+from django.utils import translation
 from django.utils.encoding import force_str
-from wagtail.admin.admin_url_finder import AdminURLFinder
-from wagtail.models import Site
+from django.utils.http import RFC3986_SUBDELIMS
+from wagtail.admin.admin_url_finder import (
+    AdminURLFinder,
+    ModelAdminURLFinder,
+    finder_classes,
+)
+from wagtail.admin.wagtail_hooks import PageAdminURLFinder
+from wagtail.coreutils import WAGTAIL_APPEND_SLASH
+from wagtail.hooks import search_for_hooks
+from wagtail.models import Page, Site
+from wagtail.snippets.models import SnippetAdminURLFinder
+
+
+# Page sizes for the paginated API views
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+# Sampled API results, the same seed choosing the same objects
+DEFAULT_SEED = "0"
+SAMPLE_ROUNDS = 3
+# Points looked up at once, fewer on databases that limit the query parameters
+SAMPLE_MAX_POINTS = 10000
+
+# Models serialized at once by the async views, unless DEVTOOLS_API_WORKERS is set
+DEFAULT_ASYNC_API_WORKERS = 4
+
+# Streamed API views
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+STREAM_CHUNK_SIZE = 2000
+# Bytes sent at once by the async streamed views
+STREAM_BATCH_SIZE = 64 * 1024
+
+# The keys of each result, in the order of the columnar format's values
+RESULT_COLUMNS = ["title", "app_name", "class_name", "editor_url", "url"]
+
+# Models counted per UNION ALL query, below SQLite's limit of 500 compound SELECTs
+COUNT_BATCH_SIZE = 100
+
+# Paths below a site root that reverse("wagtail_serve") accepts unchanged
+SERVE_PATH_RE = re.compile(r"^(?:[\w\-]+/)*$")
+
+# Reversed in place of a real primary key to find where it sits in a URL pattern
+PK_PLACEHOLDER = "9876543210123456789"
+
+
+def get_admin_edit_url(host, obj, resolver=None):
+    resolver = resolver or AdminEditURLResolver()
+    return f"{get_host(host)}{resolver.get_edit_url(obj)}"
+
+
+class AdminEditURLResolver:
+    """Resolve admin edit URLs for many objects, working out each model's URL once.
+
+    Where the registered finder builds the URL from the primary key alone, the URL
+    pattern is reversed once per model and each edit URL is then formatted from the
+    primary key. Anything else is handed to a single, shared AdminURLFinder.
+    The last resolved URL is remembered so asking again for the same object is free,
+    without holding on to every URL of a large inventory.
+    """
+
+    def __init__(self):
+        self.finder = AdminURLFinder()
+        self.templates = {}
+        self.last = (None, None)
+
+    def get_edit_url(self, obj):
+        key = (type(obj), getattr(obj, "pk", None))
+        if self.last[0] != key:
+            self.last = (key, self._resolve(obj))
+        return self.last[1]
+
+    def _resolve(self, obj):
+        pk = getattr(obj, "pk", None)
+        template = self._get_template(obj) if isinstance(pk, int) else None
+        if template is None:
+            return self.finder.get_edit_url(obj)
+        prefix, suffix = template
+        return f"{prefix}{obj.pk}{suffix}"
+
+    def _get_template(self, obj):
+        model = type(obj)
+        if model not in self.templates:
+            self.templates[model] = self._build_template(obj)
+        return self.templates[model]
+
+    def _build_template(self, obj):
+        url_name = get_edit_url_name(type(obj))
+        if url_name is None:
+            return None
+
+        try:
+            url = reverse(url_name, args=(PK_PLACEHOLDER,))
+        except NoReverseMatch:
+            return None
+        if url.count(PK_PLACEHOLDER) != 1:
+            return None
+
+        prefix, suffix = url.split(PK_PLACEHOLDER)
+        # Only trust the template when it agrees with the registered finder
+        if f"{prefix}{obj.pk}{suffix}" != self.finder.get_edit_url(obj):
+            return None
+        return prefix, suffix
+
+
+class PageURLResolver:
+    """Resolve the frontend URLs of many pages, as Page.get_url() does without a request.
+
+    Site root paths are loaded and the wagtail_serve URL is reversed once, then
+    each page URL is worked out from its url_path. Pages that customise their
+    URLs, and sites using WAGTAIL_I18N_ENABLED, fall back to Page.get_url().
+    """
+
+    def __init__(self):
+        self.site_root_paths = Site.get_site_root_paths()
+        self.num_sites = len({root_path[0] for root_path in self.site_root_paths})
+        try:
+            self.serve_prefix = reverse("wagtail_serve", args=("",))
+        except NoReverseMatch:
+            self.serve_prefix = None
+
+    def get_url(self, page):
+        if not self.has_default_urls(type(page)):
+            # Share the site root paths rather than looking them up for each page
+            page._wagtail_cached_site_root_paths = self.site_root_paths
+            return page.get_url()
+
+        for site_id, root_path, root_url, language_code in self.site_root_paths:
+            if page.url_path.startswith(root_path):
+                break
+        else:
+            return None
+
+        start = len(root_path)
+        page_path = self.get_page_path(page.url_path[start:])
+        if page_path is None or self.num_sites == 1:
+            return page_path
+        return root_url + page_path
 
+    def get_page_path(self, path):
+        if self.serve_prefix is None:
+            return None
 
-def get_admin_edit_url(host, obj):
-    return f"{get_host(host)}{AdminURLFinder().get_edit_url(obj)}"
+        if SERVE_PATH_RE.match(path):
+            page_path = self.serve_prefix + quote(path, safe=RFC3986_SUBDELIMS + "/~:@")
+        else:
+            try:
+                page_path = reverse("wagtail_serve", args=(path,))
+            except NoReverseMatch:
+                return None
+
+        if not WAGTAIL_APPEND_SLASH and page_path != "/":
+            page_path = page_path.rstrip("/")
+        return page_path
+
+    @staticmethod
+    def has_default_urls(model):
+        return (
+            model.get_url_parts is Page.get_url_parts
+            and model.get_url is Page.get_url
+            and not getattr(settings, "WAGTAIL_I18N_ENABLED", False)
+        )
+
+
+class SerializationContext:
+    """What serializing results needs that doesn't change during a request: the
+    host, the admin edit URL resolver, the page URL resolver with its site root
+    paths and the title field of each model.
+
+    Build one per request and pass it to the serializers and result items, rather
+    than working these out again for each item. Without a page URL resolver page
+    URLs come from Page.get_url()."""
+
+    def __init__(self, request=None, resolver=None, page_url_resolver=None):
+        self.request = request
+        self.host = get_host(request)
+        self.resolver = resolver or AdminEditURLResolver()
+        self.page_url_resolver = page_url_resolver
+        self.title_fields = default_field_identifier()
+        self.title_keys = {}
+
+    def copy(self):
+        """Return a context with its own admin edit URL resolver, which isn't thread
+        safe, sharing everything else."""
+
+        context = copy.copy(self)
+        context.resolver = AdminEditURLResolver()
+        return context
+
+    def get_title(self, obj):
+        model = type(obj)
+        if model not in self.title_keys:
+            self.title_keys[model] = next(
+                (key for key in self.title_fields if hasattr(obj, key)), None
+            )
+        key = self.title_keys[model]
+        if key is None:
+            return "Title Field not found"
+        return getattr(obj, key)
+
+    def get_edit_url(self, obj):
+        return f"{self.host}{self.resolver.get_edit_url(obj)}"
+
+    def get_url(self, obj):
+        if self.page_url_resolver and isinstance(obj, Page):
+            return self.page_url_resolver.get_url(obj)
+        return obj.get_url() if hasattr(obj, "get_url") else None
+
+
+def get_context(request):
+    """Return request if it's already a SerializationContext, otherwise a new
+    context for it."""
+
+    if isinstance(request, SerializationContext):
+        return request
+    return SerializationContext(request)
+
+
+def default_field_identifier():
+    if hasattr(settings, "DEVTOOLS_FIELD_IDENTIFIER"):
+        return settings.DEVTOOLS_FIELD_IDENTIFIER
+    return ["title", "name", "username", "hostname"]
+
+
+def register_admin_url_finders():
+    """Make sure every AdminURLFinder is registered, however early this is called.
+
+    Most are registered by wagtail_hooks files, but the admin viewsets, e.g. for
+    sites and groups, register theirs as the admin URLconf is imported."""
+
+    search_for_hooks()
+    import wagtail.admin.urls  # noqa: F401
+
+
+def has_admin_url_finder(model):
+    """Return True if an AdminURLFinder is registered for the model."""
+    register_admin_url_finders()
+    return finder_classes.get_by_type(model) is not None
+
+
+def get_edit_url_name(model):
+    """Return the URL name of the admin edit view for a model, if the registered
+    AdminURLFinder reverses it from the primary key alone, otherwise None."""
+
+    register_admin_url_finders()
+    finder_class = finder_classes.get_by_type(model)
+    if not isinstance(finder_class, type):
+        return None
+    if issubclass(finder_class, PageAdminURLFinder) and issubclass(model, Page):
+        return "wagtailadmin_pages:edit"
+    if issubclass(finder_class, SnippetAdminURLFinder) and hasattr(
+        model, "snippet_viewset"
+    ):
+        return model.snippet_viewset.get_url_name("edit")
+    if (
+        issubclass(finder_class, ModelAdminURLFinder)
+        and finder_class.construct_edit_url is ModelAdminURLFinder.construct_edit_url
+    ):
+        return finder_class.edit_url_name
+    return None
 
 
 def get_host(request=None):
@@ -31,3 +304,233 @@ def get_host(request=None):
 
 def init_ret(title):
     return {"meta": {"title": title}, "results": []}
+
+
+def encode_cursor(app_label, model_name, pk):
+    """Encode a position in the inventory as an opaque cursor."""
+    if not isinstance(pk, int):
+        pk = str(pk)
+    position = json.dumps([app_label, model_name, pk], separators=(",", ":"))
+    return base64.urlsafe_b64encode(position.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Decode a cursor from encode_cursor() into (app_label, model_name, pk).
+
+    Raises ValueError if the cursor is not one we created."""
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        app_label, model_name, pk = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if not isinstance(app_label, str) or not isinstance(model_name, str):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if isinstance(pk, bool) or not isinstance(pk, (int, str)):
+        # encode_cursor() only writes integer and string primary keys
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return app_label, model_name, pk
+
+
+def get_limit(request):
+    """Return the page size requested with ?limit=, capped at MAX_LIMIT.
+
+    Raises ValueError if it isn't a positive integer."""
+
+    limit = request.GET.get("limit") or DEFAULT_LIMIT
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid limit: {limit}")
+    if limit < 1:
+        raise ValueError(f"Invalid limit: {limit}")
+    return min(limit, MAX_LIMIT)
+
+
+def get_sample(request):
+    """Return the number of objects per model requested with ?sample=, capped at
+    MAX_LIMIT, and the ?seed= to choose them with, "0" unless given.
+
+    Raises ValueError if the sample isn't a positive integer."""
+
+    sample = request.GET.get("sample")
+    try:
+        sample = int(sample)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid sample: {sample}")
+    if sample < 1:
+        raise ValueError(f"Invalid sample: {sample}")
+    return min(sample, MAX_LIMIT), request.GET.get("seed") or DEFAULT_SEED
+
+
+def get_next_url(request, cursor):
+    query = request.GET.copy()
+    query["cursor"] = cursor
+    return f"{get_host(request)}{request.path}?{query.urlencode()}"
+
+
+def get_query_list(request, name):
+    """Return the values of a query parameter that may be repeated, comma separated
+    or both."""
+
+    if hasattr(request.GET, "getlist"):
+        values = request.GET.getlist(name)
+    else:
+        # A plain dict, as set by some callers
+        values = [request.GET[name]] if request.GET.get(name) else []
+
+    return [value.strip() for value in ",".join(values).split(",") if value.strip()]
+
+
+def wants_ndjson(request):
+    """Return True if the request asks for newline delimited JSON, with either
+    ?format=ndjson or an Accept header."""
+
+    if request.GET.get("format") == "ndjson":
+        return True
+    return NDJSON_CONTENT_TYPE in request.headers.get("Accept", "")
+
+
+def wants_columnar(request):
+    return request.GET.get("format") == "columnar"
+
+
+def get_api_workers():
+    """Return the number of threads to serialize models with, 1 by default."""
+
+    if hasattr(settings, "DEVTOOLS_API_WORKERS") and settings.DEVTOOLS_API_WORKERS:
+        return max(int(settings.DEVTOOLS_API_WORKERS), 1)
+    return 1
+
+
+def get_async_api_workers():
+    """Return the number of threads async views serialize models with at once,
+    DEFAULT_ASYNC_API_WORKERS unless DEVTOOLS_API_WORKERS is set."""
+
+    if hasattr(settings, "DEVTOOLS_API_WORKERS") and settings.DEVTOOLS_API_WORKERS:
+        return get_api_workers()
+    return DEFAULT_ASYNC_API_WORKERS
+
+
+def map_models(func, models):
+    """Return a list of func(model) for each model, in the order of models.
+
+    With DEVTOOLS_API_WORKERS above 1 the models are handled in a thread pool,
+    each thread using the current URL and language settings and its own
+    database connections, which are closed once all the models are done."""
+
+    workers = get_api_workers()
+    if workers == 1 or len(models) < 2:
+        return [func(model) for model in models]
+
+    opened = set()
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        return list(executor.map(in_worker_thread(func, opened), models))
+    finally:
+        close_worker_pool(executor, opened)
+
+
+async def amap_models(func, models):
+    """Return a list of func(model) for each model, in the order of models.
+
+    For async views: the models are handled concurrently in the thread pool shared
+    by all async requests, of get_async_api_workers() threads, and awaited
+    together. With one worker they are handled one after another in the thread
+    sync code normally runs in. As for map_models() each thread uses the current
+    URL and language settings and its own database connections."""
+
+    workers = get_async_api_workers()
+    if workers == 1 or len(models) < 2:
+        # Like other sync code called from async views, in the request's thread
+        call = sync_to_async(func)
+        return [await call(model) for model in models]
+
+    loop = asyncio.get_running_loop()
+    executor = await sync_to_async(async_worker_pool.acquire)(workers)
+    call = in_worker_thread(func, async_worker_pool.opened)
+    try:
+        return list(
+            await asyncio.gather(
+                *(loop.run_in_executor(executor, call, model) for model in models)
+            )
+        )
+    finally:
+        await sync_to_async(async_worker_pool.release)()
+
+
+class AsyncWorkerPool:
+    """The thread pool of the async views, shared so that concurrent requests don't
+    each start their own threads and database connections.
+
+    The connections its threads open are closed whenever no request is using it,
+    which is also when it is replaced if the number of workers has changed."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.executor = None
+        self.workers = None
+        self.users = 0
+        self.opened = set()
+
+    def acquire(self, workers):
+        with self.lock:
+            if self.executor and self.users == 0 and self.workers != workers:
+                self.executor.shutdown()
+                self.executor = None
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=workers)
+                self.workers = workers
+            self.users += 1
+            return self.executor
+
+    def release(self):
+        with self.lock:
+            self.users -= 1
+            if self.users == 0:
+                close_connections(self.opened)
+                self.opened.clear()
+
+
+async_worker_pool = AsyncWorkerPool()
+
+
+def in_worker_thread(func, opened):
+    """Wrap func to be called in a thread pool with the current URL and language
+    settings, which are thread local, adding the thread's database connections to
+    opened, to be closed by close_connections()."""
+
+    script_prefix = get_script_prefix()
+    urlconf = get_urlconf()
+    language = translation.get_language()
+
+    def call(*args):
+        set_script_prefix(script_prefix)
+        set_urlconf(urlconf)
+        try:
+            with translation.override(language):
+                return func(*args)
+        finally:
+            opened.update(connections.all())
+
+    return call
+
+
+def close_worker_pool(executor, opened):
+    """Wait for the threads of a pool to finish, then close the database
+    connections they opened, once each rather than after every call."""
+
+    executor.shutdown()
+    close_connections(opened)
+
+
+def close_connections(opened):
+    """Close database connections of threads that aren't using them."""
+
+    for connection in list(opened):
+        # The threads are done, so their connections can be closed from this one
+        connection.inc_thread_sharing()
+        try:
+            connection.close()
+        finally:
+            connection.dec_thread_sharing()
@@ -0,0 +1,214 @@
+"""
+A materialized copy of the wagtail-core-apps ?all=1 results, kept in an SQLite file:
+
+    DEVTOOLS_API_MANIFEST = BASE_DIR / "devtools_manifest.sqlite3"
+
+Build it with the build_api_manifest management command. Once it exists, saving,
+deleting or publishing an object updates its rows (see signal_handlers.py) and the
+API serves ?all=1 from it. Other tools can query the results table directly.
+
+Page urls also change when Wagtail rewrites the url paths of descendant pages, as a
+page is moved or its slug changed, and when a site is saved, so the rows of those
+pages are replaced then too.
+
+As there is no request when the manifest is built, editor urls use the
+WAGTAIL_DEVTOOLS_BASE_URL or WAGTAILADMIN_BASE_URL setting.
+"""
+
+import os
+import sqlite3
+
+from contextlib import closing
+
+from django.conf import settings
+from wagtail.models import Page
+
+from wagtail_devtools.api.cache import get_related_models
+from wagtail_devtools.api.conf import (
+    get_inventory_models,
+    get_wagtail_core_edit_pages_config,
+)
+from wagtail_devtools.api.helpers import STREAM_CHUNK_SIZE
+from wagtail_devtools.api.serializers import iter_inventory_results
+
+
+SCHEMA = """
+CREATE TABLE models (
+    label TEXT PRIMARY KEY,
+    position INTEGER NOT NULL
+);
+CREATE TABLE results (
+    position INTEGER NOT NULL,
+    model TEXT NOT NULL,
+    pk NOT NULL,
+    title TEXT,
+    app_name TEXT,
+    class_name TEXT,
+    editor_url TEXT NOT NULL UNIQUE,
+    url TEXT,
+    PRIMARY KEY (model, pk)
+);
+CREATE INDEX results_order ON results (position, pk);
+"""
+
+INSERT_RESULT = """
+INSERT OR IGNORE INTO results
+    (position, model, pk, title, app_name, class_name, editor_url, url)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def get_manifest_path():
+    """Return the path of the manifest, or None if it isn't enabled."""
+
+    if hasattr(settings, "DEVTOOLS_API_MANIFEST") and settings.DEVTOOLS_API_MANIFEST:
+        return str(settings.DEVTOOLS_API_MANIFEST)
+
+
+def manifest_exists():
+    path = get_manifest_path()
+    return path is not None and os.path.exists(path)
+
+
+def build_manifest(path):
+    """Write every result to a new manifest at path, returning how many there are.
+
+    The manifest is built alongside and then moved into place, so readers never
+    see a partly built one."""
+
+    models = get_inventory_models(get_wagtail_core_edit_pages_config())
+    positions = {model._meta.label: position for position, model in enumerate(models)}
+
+    building = f"{path}.building"
+    if os.path.exists(building):
+        os.remove(building)
+
+    with closing(sqlite3.connect(building)) as connection:
+        connection.executescript(SCHEMA)
+        connection.executemany(
+            "INSERT INTO models (label, position) VALUES (?, ?)", positions.items()
+        )
+
+        rows = []
+        for model, pk, result in iter_inventory_results(None, models):
+            rows.append(get_row(positions[model._meta.label], model, pk, result))
+            if len(rows) >= STREAM_CHUNK_SIZE:
+                connection.executemany(INSERT_RESULT, rows)
+                rows = []
+        connection.executemany(INSERT_RESULT, rows)
+        connection.commit()
+
+        count = connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    os.replace(building, path)
+    return count
+
+
+def update_manifest(path, model, pk):
+    """Replace the rows of an object that has been saved or deleted."""
+
+    models = get_inventory_models(get_wagtail_core_edit_pages_config())
+    related = [other for other in get_related_models(model) if other in models]
+
+    with closing(sqlite3.connect(path)) as connection:
+        positions = dict(connection.execute("SELECT label, position FROM models"))
+
+        for other in related:
+            connection.execute(
+                "DELETE FROM results WHERE model = ? AND pk = ?",
+                (other._meta.label, pk if isinstance(pk, int) else str(pk)),
+            )
+
+        related = [other for other in related if other._meta.label in positions]
+        connection.executemany(
+            INSERT_RESULT,
+            [
+                get_row(positions[other._meta.label], other, pk, result)
+                for other, pk, result in iter_inventory_results(
+                    None, models, only=related, pk=pk
+                )
+            ],
+        )
+        connection.commit()
+
+
+def update_manifest_models(path, models, **filters):
+    """Replace the rows of the objects of models matching filters, e.g.
+    path__startswith for a page and its descendants, or of all their objects."""
+
+    inventory_models = get_inventory_models(get_wagtail_core_edit_pages_config())
+    models = [model for model in models if model in inventory_models]
+
+    with closing(sqlite3.connect(path)) as connection:
+        positions = dict(connection.execute("SELECT label, position FROM models"))
+
+        for model in models:
+            if not filters:
+                connection.execute(
+                    "DELETE FROM results WHERE model = ?", (model._meta.label,)
+                )
+                continue
+            pks = model.objects.filter(**filters).order_by("pk").values_list("pk")
+            connection.executemany(
+                "DELETE FROM results WHERE model = ? AND pk = ?",
+                (
+                    (model._meta.label, pk if isinstance(pk, int) else str(pk))
+                    for (pk,) in pks.iterator(chunk_size=STREAM_CHUNK_SIZE)
+                ),
+            )
+
+        models = [model for model in models if model._meta.label in positions]
+        rows = []
+        for model, pk, result in iter_inventory_results(
+            None, inventory_models, only=models, **filters
+        ):
+            rows.append(get_row(positions[model._meta.label], model, pk, result))
+            if len(rows) >= STREAM_CHUNK_SIZE:
+                connection.executemany(INSERT_RESULT, rows)
+                rows = []
+        connection.executemany(INSERT_RESULT, rows)
+        connection.commit()
+
+
+def update_manifest_pages(path, **filters):
+    """Replace the rows of the pages matching filters, or of every page, after their
+    urls may have changed."""
+
+    models = get_inventory_models(get_wagtail_core_edit_pages_config())
+    update_manifest_models(
+        path, [model for model in models if issubclass(model, Page)], **filters
+    )
+
+
+def read_manifest(path):
+    """Yield the results in the manifest, in the order they were built."""
+
+    with closing(sqlite3.connect(path)) as connection:
+        cursor = connection.execute(
+            """
+            SELECT title, app_name, class_name, editor_url, url FROM results
+            ORDER BY position, pk
+            """
+        )
+        while rows := cursor.fetchmany(STREAM_CHUNK_SIZE):
+            for title, app_name, class_name, editor_url, url in rows:
+                yield {
+                    "title": title,
+                    "app_name": app_name,
+                    "class_name": class_name,
+                    "editor_url": editor_url,
+                    "url": url,
+                }
+
+
+def get_row(position, model, pk, result):
+    return (
+        position,
+        model._meta.label,
+        pk if isinstance(pk, int) else str(pk),
+        None if result["title"] is None else str(result["title"]),
+        result["app_name"],
+        result["class_name"],
+        result["editor_url"],
+        result["url"],
+    )
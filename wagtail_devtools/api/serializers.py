@@ -1,61 +1,673 @@
+import hashlib
+import math
+import random
+
+from asgiref.sync import sync_to_async
 from django.apps import apps
-from wagtail.admin.admin_url_finder import AdminURLFinder
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connections
+from django.db.models import Count, IntegerField, Max, Value
+from wagtail.models import Page
 from wagtail.models.collections import Collection
 from wagtail.snippets.models import get_snippet_models
 
+from wagtail_devtools.api.cache import (
+    get_cached_listing_results,
+    get_cached_model_results,
+)
+from wagtail_devtools.api.conf import (
+    get_config_models,
+    get_inventory_models,
+    get_listing_urls,
+)
 from wagtail_devtools.api.dataclasses import (
     Results,
     ResultsListingItem,
     ResultsModelItem,
 )
-from wagtail_devtools.api.helpers import init_ret
+from wagtail_devtools.api.encoders import dumps
+from wagtail_devtools.api.helpers import (
+    COUNT_BATCH_SIZE,
+    RESULT_COLUMNS,
+    SAMPLE_MAX_POINTS,
+    SAMPLE_ROUNDS,
+    STREAM_CHUNK_SIZE,
+    PageURLResolver,
+    SerializationContext,
+    amap_models,
+    decode_cursor,
+    default_field_identifier,
+    encode_cursor,
+    get_edit_url_name,
+    get_next_url,
+    has_admin_url_finder,
+    init_ret,
+    map_models,
+)
 
 
 def wagtail_core_listing_pages_serializer(request, config, title):
     ret = init_ret(title)
     results = Results()
 
-    for app in config["apps"]:
-        results.add(ResultsListingItem(request, app).get())
+    for item in get_listing_results(request, config):
+        results.add(item)
 
     ret["results"] = results.get()
 
+    # Reported rather than failing the response, e.g. when hooks aren't installed
+    unresolved = get_listing_urls(config)[1]
+    if unresolved:
+        ret["meta"]["unresolved"] = list(unresolved)
+
     return ret
 
 
+def get_listing_results(request, config):
+    def build():
+        context = SerializationContext(request)
+        urls, unresolved = get_listing_urls(config)
+        return [ResultsListingItem(context, app, path).get() for app, path in urls]
+
+    return get_cached_listing_results(request, config, build)
+
+
 def wagtail_core_apps_serializer(request, config, title, all=False):
-    ret = init_ret(title)
+    serialize, models = get_model_serializer(request, config, all)
+
+    # Models may be serialized concurrently, their results are added in order
+    return merge_model_results(title, map_models(serialize, models))
+
+
+async def wagtail_core_apps_serializer_async(request, config, title, all=False):
+    """wagtail_core_apps_serializer for async views, serializing the models
+    concurrently and awaiting them together."""
+
+    serialize, models = await sync_to_async(get_model_serializer)(request, config, all)
+    return merge_model_results(title, await amap_models(serialize, models))
+
+
+def get_model_serializer(request, config, all):
+    """Return a function returning the results of a model, and the models to call
+    it for. Pages listed with one query are read here, up front."""
 
     # Making the assumption here that any page visible on the frontend will have an editor url
 
+    context = SerializationContext(request, page_url_resolver=PageURLResolver())
+    snippet_models = get_snippet_models()
+    models = get_config_models(config)
+    inventory_models = get_inventory_models(config)
+
+    page_models, page_results = [], {}
+    if all:
+        # Pages are read with one query rather than one per page model
+        page_models = get_page_inventory_models(models)
+    if page_models:
+        page_results = get_cached_model_results(
+            request,
+            Page,
+            get_page_results_variant(page_models),
+            lambda: get_page_results(context, inventory_models, page_models),
+        )
+
+    def serialize(model):
+        if model in page_models:
+            return page_results.get(model._meta.label, [])
+        if all and is_listed_by_concrete_model(model, inventory_models):
+            return []
+        return get_cached_model_results(
+            request,
+            model,
+            get_model_results_variant(model, inventory_models) if all else "first",
+            lambda: get_model_results(
+                context.copy(), model, inventory_models if all else None, snippet_models
+            ),
+        )
+
+    return serialize, models
+
+
+def merge_model_results(title, model_results):
+    ret = init_ret(title)
+    results = Results()
+
+    for items in model_results:
+        for item in items:
+            results.add(item)
+
+    ret["results"] = results.get()
+
+    return ret
+
+
+def get_model_results(context, model, inventory_models, snippet_models):
+    """Return the results for the first object of a model or, given the inventory
+    models, all of its objects that aren't listed under a more specific one, in
+    primary key order as the other modes list them."""
+
+    if inventory_models is None:
+        item = project_queryset(model.objects.all()).first()
+        if isinstance(item, Collection):
+            item = Collection.objects.first().get_first_child()
+        if context.resolver.get_edit_url(item):
+            return [ResultsModelItem(context, item).get()]
+        return []
+
+    # Read in chunks so only a chunk of model instances is alive at a time
+    queryset = get_inventory_queryset(model, inventory_models).order_by("pk")
+    return [
+        ResultsModelItem(context, item).get()
+        for item in queryset.iterator(chunk_size=STREAM_CHUNK_SIZE)
+        if is_inventory_item(item, snippet_models, context)
+    ]
+
+
+def get_model_results_variant(model, inventory_models):
+    """Return the cache variant of all the results of a model, which depend on the
+    more specific models whose objects are listed under them instead."""
+
+    children = [
+        other._meta.label_lower
+        for other in inventory_models
+        if other is not model and issubclass(other, model) and not other._meta.proxy
+    ]
+    if not children:
+        return "all"
+    return "all:" + hashlib.md5(",".join(children).encode()).hexdigest()
+
+
+def get_page_inventory_models(models):
+    """Return the page models whose results can be built from the columns of
+    wagtailcore_page alone, so don't need their specific rows loaded."""
+
+    page_fields = {field.name for field in Page._meta.concrete_fields}
+    page_models = []
+
+    for model in models:
+        if not issubclass(model, Page) or not has_admin_url_finder(model):
+            continue
+        if is_listed_by_concrete_model(model, models):
+            continue
+        fields = get_inventory_fields(model)
+        if fields is not None and set(fields[1:]) <= page_fields:
+            page_models.append(model)
+
+    return page_models
+
+
+def get_page_results_variant(page_models):
+    labels = ",".join(model._meta.label_lower for model in page_models)
+    return "pages:" + hashlib.md5(labels.encode()).hexdigest()
+
+
+def get_page_results(context, models, page_models):
+    """Return the results of the pages listed under page_models, by model label.
+
+    Every page is read with one query on wagtailcore_page and listed under the most
+    specific of the inventory models it is an instance of, as serializing each model
+    would. The instance is made from the content type, primary key, title and
+    url_path columns, without loading the specific row."""
+
+    inventory_page_models = [
+        model
+        for model in models
+        if issubclass(model, Page) and not is_listed_by_concrete_model(model, models)
+    ]
+    fields = ["pk", "content_type", *get_inventory_fields(Page)[1:]]
+    page_results = {}
+
+    for pk, content_type_id, *values in (
+        Page.objects.order_by("pk")
+        .values_list(*fields)
+        .iterator(chunk_size=STREAM_CHUNK_SIZE)
+    ):
+        model = get_counted_page_model(
+            ContentType.objects.get_for_id(content_type_id).model_class(),
+            inventory_page_models,
+        )
+        if model not in page_models:
+            # Not listed, or listed by a model that needs its specific row
+            continue
+
+        item = make_page(model, pk, dict(zip(fields[2:], values)))
+        if context.resolver.get_edit_url(item):
+            page_results.setdefault(model._meta.label, []).append(
+                ResultsModelItem(context, item).get()
+            )
+
+    return page_results
+
+
+def make_page(model, pk, values):
+    """Return an instance of a page model with only its primary key (and those of
+    the models it inherits from) and the given Page fields loaded."""
+
+    attnames, row = [], []
+    for field in model._meta.concrete_fields:
+        if field.primary_key or (field.one_to_one and field.remote_field.parent_link):
+            attnames.append(field.attname)
+            row.append(pk)
+        elif field.name in values:
+            attnames.append(field.attname)
+            row.append(values[field.name])
+    return model.from_db(Page.objects.db, attnames, row)
+
+
+def wagtail_core_apps_paginated_serializer(request, config, title, limit, cursor=None):
+    """Serialize one page of every object with an admin edit view.
+
+    Models are walked in config order and their objects in primary key order,
+    so each page is a primary key range query per model, starting just after
+    the (app, model, pk) position held in the cursor.
+
+    Raises ValueError if the cursor is invalid."""
+
+    ret = init_ret(title)
+    results = Results()
+    context = SerializationContext(request, page_url_resolver=PageURLResolver())
+    models = get_inventory_models(config)
+    snippet_models = get_snippet_models()
+
+    start, after = 0, None
+    if cursor:
+        app_label, model_name, after = decode_cursor(cursor)
+        start = get_model_index(models, app_label, model_name)
+        try:
+            after = models[start]._meta.pk.to_python(after)
+        except ValidationError:
+            # Not a primary key of the model, e.g. a string for an integer key
+            raise ValueError(f"Invalid cursor: {cursor}")
+
+    last = None
+    for model in models[start:]:
+        if is_listed_by_concrete_model(model, models):
+            continue
+
+        queryset = get_inventory_queryset(model, models).order_by("pk")
+        if after is not None:
+            queryset = queryset.filter(pk__gt=after)
+            after = None
+
+        while len(results) < limit:
+            batch = list(queryset[: limit - len(results)])
+            if not batch:
+                break
+            for item in batch:
+                if is_inventory_item(item, snippet_models, context):
+                    results.add(ResultsModelItem(context, item).get())
+            last = (model, batch[-1].pk)
+            queryset = queryset.filter(pk__gt=batch[-1].pk)
+
+        if len(results) >= limit:
+            break
+    else:
+        last = None
+
+    next_cursor = None
+    if last is not None:
+        model, pk = last
+        next_cursor = encode_cursor(model._meta.app_label, model.__name__, pk)
+
+    ret["meta"]["limit"] = limit
+    ret["meta"]["next_cursor"] = next_cursor
+    ret["meta"]["next"] = get_next_url(request, next_cursor) if next_cursor else None
+    ret["results"] = results.get()
+
+    return ret
+
+
+def wagtail_core_apps_sample_serializer(request, config, title, sample, seed):
+    """Serialize up to sample objects of every inventory model, spread over each
+    model's primary key range.
+
+    The objects are chosen with a random.Random seeded with seed and the model
+    label, so the same seed chooses the same objects while the data is
+    unchanged. See get_sample_pks()."""
+
+    ret = init_ret(title)
     results = Results()
+    context = SerializationContext(request, page_url_resolver=PageURLResolver())
+    models = get_inventory_models(config)
+    snippet_models = get_snippet_models()
+
+    for model in models:
+        if is_listed_by_concrete_model(model, models):
+            continue
 
-    for app in config["apps"]:
-        models = apps.get_app_config(app["app_name"]).get_models()
-        if not all:
-            for model in models:
-                item = model.objects.first()
-                if isinstance(item, Collection):
-                    item = Collection.objects.first().get_first_child()
-                if AdminURLFinder().get_edit_url(item):
-                    results.add(ResultsModelItem(request, item).get())
-        else:
-            for model in models:
-                items = model.objects.all()
-                if isinstance(items.first(), Collection):
-                    for item in items:
-                        # if AdminURLFinder().get_edit_url(item): # TODO decide if this is required, do some testing on real data
-                        results.add(ResultsModelItem(request, item).get())
-                snippet_models = [model.__name__ for model in get_snippet_models()]
-                if model.__name__ in snippet_models:
-                    for item in items:
-                        # if AdminURLFinder().get_edit_url(item): # TODO decide if this is required, do some testing on real data
-                        results.add(ResultsModelItem(request, item).get())
-                else:
-                    for item in items:
-                        if AdminURLFinder().get_edit_url(item):
-                            results.add(ResultsModelItem(request, item).get())
+        queryset = get_inventory_queryset(model, models)
+        pks = get_sample_pks(
+            queryset, sample, random.Random(f"{seed}:{model._meta.label}")
+        )
+        if not pks:
+            continue
+        for item in queryset.filter(pk__in=pks).order_by("pk"):
+            if is_inventory_item(item, snippet_models, context):
+                results.add(ResultsModelItem(context, item).get())
 
+    ret["meta"]["sample"] = sample
+    ret["meta"]["seed"] = seed
     ret["results"] = results.get()
 
     return ret
+
+
+def get_sample_pks(queryset, sample, rng):
+    """Return up to sample primary keys of the objects in queryset.
+
+    Rather than ORDER BY RANDOM(), which reads and sorts every row, or a COUNT and
+    OFFSETs, which scan the table, the first sample + 1 primary keys are read, and
+    returned if that's all of them. Otherwise random points between the lowest and
+    highest primary key are looked up with one pk__in query, enough of them to find
+    the objects still needed judging by how densely the keys are used, for up to
+    SAMPLE_ROUNDS rounds. So every object is as likely to be chosen and a sample
+    takes at most 2 + SAMPLE_ROUNDS queries. If the keys are too sparse to find
+    them all, the sample is made up from the first objects.
+
+    Primary keys that aren't integers have no range to look up points in, so
+    random offsets are drawn instead, the objects counted, and the primary keys
+    read in order up to the last offset, in 3 queries."""
+
+    pks = queryset.order_by("pk").values_list("pk", flat=True)
+    head = list(pks[: sample + 1])
+
+    if len(head) <= sample:
+        return head
+
+    if not isinstance(head[0], int):
+        offsets = set(rng.sample(range(pks.count()), sample))
+        return [
+            pk
+            for offset, pk in enumerate(
+                pks[: max(offsets) + 1].iterator(chunk_size=STREAM_CHUNK_SIZE)
+            )
+            if offset in offsets
+        ]
+
+    low = head[0]
+    high = queryset.aggregate(high=Max("pk"))["high"]
+    density = len(head) / (head[-1] - low + 1)
+    max_points = get_max_points(queryset)
+
+    picked = set()
+    for _ in range(SAMPLE_ROUNDS):
+        needed = sample - len(picked)
+        count = min(max_points, high - low + 1, math.ceil(2 * needed / density))
+        points = set(rng.sample(range(low, high + 1), count)) - picked
+        found = list(pks.filter(pk__in=points))
+        picked.update(found)
+        if len(picked) >= sample:
+            break
+        density = max(len(found), 1) / count
+
+    if len(picked) > sample:
+        picked = rng.sample(sorted(picked), sample)
+    else:
+        rest = [pk for pk in head if pk not in picked]
+        picked.update(rest[: sample - len(picked)])
+    return sorted(picked)
+
+
+def get_max_points(queryset):
+    """Return how many primary keys get_sample_pks() can look up in one query."""
+
+    max_query_params = connections[queryset.db].features.max_query_params
+    if max_query_params:
+        # Leave room for any parameters of the queryset
+        return min(SAMPLE_MAX_POINTS, max_query_params - 99)
+    return SAMPLE_MAX_POINTS
+
+
+def wagtail_core_model_counts_serializer(request, config, title):
+    """Count the objects of every inventory model, without loading any of them.
+
+    Pages are counted with one query grouped by content type, each page being
+    counted under the most specific inventory model it is an instance of. Other
+    models are counted COUNT_BATCH_SIZE at a time, with one UNION ALL query per
+    batch. Counts are of rows, so may include objects without an edit url."""
+
+    ret = init_ret(title)
+    inventory_models = get_inventory_models(config)
+    models = [
+        model
+        for model in inventory_models
+        if not is_listed_by_concrete_model(model, inventory_models)
+    ]
+    counts = dict.fromkeys(models, 0)
+
+    page_models = [model for model in models if issubclass(model, Page)]
+    if page_models:
+        for content_type_id, count in (
+            Page.objects.order_by()
+            .values_list("content_type")
+            .annotate(count=Count("pk"))
+        ):
+            model = get_counted_page_model(
+                ContentType.objects.get_for_id(content_type_id).model_class(),
+                page_models,
+            )
+            if model is not None:
+                counts[model] += count
+
+    other_models = [model for model in models if not issubclass(model, Page)]
+    for start in range(0, len(other_models), COUNT_BATCH_SIZE):
+        end = start + COUNT_BATCH_SIZE
+        batch = other_models[start:end]
+        querysets = [
+            get_inventory_queryset(model, models)
+            .order_by()
+            .annotate(index=Value(index, output_field=IntegerField()))
+            .values("index")
+            .annotate(count=Count("pk"))
+            for index, model in enumerate(batch)
+        ]
+        for row in querysets[0].union(*querysets[1:], all=True):
+            counts[batch[row["index"]]] = row["count"]
+
+    ret["meta"]["total"] = sum(counts.values())
+    ret["results"] = [
+        {
+            "app_name": model._meta.app_label,
+            "class_name": model.__name__,
+            "count": count,
+        }
+        for model, count in counts.items()
+    ]
+
+    return ret
+
+
+def get_counted_page_model(page_class, page_models):
+    """Return the most specific of the page models that page_class inherits from."""
+
+    if page_class is None:
+        return None
+
+    for model in page_class.__mro__:
+        if model in page_models:
+            return model
+    return None
+
+
+def columnar_stream(results, meta, host=None):
+    """Yield a compact JSON document of results, in chunks of text.
+
+    Each result is sent as a list of values in the order of meta["columns"], and
+    strings shared by many results are sent once: app_name and class_name are
+    indexes into the "app_names" and "class_names" lists that follow the results,
+    and editor urls starting with host are sent without it.
+
+    Results are consumed and sent one chunk at a time, so they're never all held in
+    memory. They should already be free of duplicates."""
+
+    meta = {**meta, "format": "columnar", "columns": RESULT_COLUMNS, "host": host}
+    app_names, class_names = {}, {}
+    start = len(host) if host else 0
+
+    yield b'{"meta": ' + dumps(meta) + b', "results": ['
+
+    rows = []
+    separator = b""
+    for result in results:
+        editor_url = result["editor_url"]
+        if start and editor_url.startswith(host):
+            editor_url = editor_url[start:]
+        row = [
+            result["title"],
+            app_names.setdefault(result["app_name"], len(app_names)),
+            class_names.setdefault(result["class_name"], len(class_names)),
+            editor_url,
+            result["url"],
+        ]
+        rows.append(dumps(row))
+        if len(rows) >= STREAM_CHUNK_SIZE:
+            yield separator + b", ".join(rows)
+            rows, separator = [], b", "
+    if rows:
+        yield separator + b", ".join(rows)
+
+    yield b'], "app_names": ' + dumps(list(app_names))
+    yield b', "class_names": ' + dumps(list(class_names)) + b"}"
+
+
+def wagtail_core_listing_pages_stream(request, config):
+    """Yield the results of wagtail_core_listing_pages_serializer one by one."""
+
+    editor_urls = set()
+
+    for item in get_listing_results(request, config):
+        if item["editor_url"] not in editor_urls:
+            editor_urls.add(item["editor_url"])
+            yield item
+
+
+def wagtail_core_apps_stream(request, config, all=False):
+    """Yield the results of wagtail_core_apps_serializer one by one.
+
+    With all=True objects are read from the database in chunks, model by model
+    in primary key order as for wagtail_core_apps_paginated_serializer, so
+    memory use doesn't grow with the size of the inventory."""
+
+    if not all:
+        yield from wagtail_core_apps_serializer(request, config, None)["results"]
+        return
+
+    models = get_inventory_models(config)
+
+    for model, pk, result in iter_inventory_results(request, models):
+        yield result
+
+
+def iter_inventory_results(request, models, only=None, **filters):
+    """Yield (model, pk, result) for the objects of the inventory models, reading
+    them in chunks, model by model in primary key order.
+
+    Pass only to limit the models read, and filters to filter their objects."""
+
+    context = SerializationContext(request, page_url_resolver=PageURLResolver())
+    snippet_models = get_snippet_models()
+
+    for model in only or models:
+        if is_listed_by_concrete_model(model, models):
+            continue
+
+        queryset = get_inventory_queryset(model, models).filter(**filters)
+        for item in queryset.order_by("pk").iterator(chunk_size=STREAM_CHUNK_SIZE):
+            if is_inventory_item(item, snippet_models, context):
+                yield model, item.pk, ResultsModelItem(context, item).get()
+
+
+def is_inventory_item(item, snippet_models, context):
+    return (
+        type(item) in snippet_models
+        or isinstance(item, Collection)
+        or bool(context.resolver.get_edit_url(item))
+    )
+
+
+def is_listed_by_concrete_model(model, models):
+    return model._meta.proxy and model._meta.concrete_model in models
+
+
+def get_model_index(models, app_label, model_name):
+    for index, model in enumerate(models):
+        if model._meta.app_label == app_label and model.__name__ == model_name:
+            return index
+    raise ValueError(f"Invalid cursor: unknown model {app_label}.{model_name}")
+
+
+def get_inventory_queryset(model, models):
+    """Return the objects of a model, leaving out any that are listed under
+    one of its more specific (multi-table inheritance) models.
+
+    Pages know their specific model, so they are filtered on their content type
+    rather than on subqueries of every more specific page table."""
+
+    queryset = project_queryset(model.objects.all())
+    children = [
+        child
+        for child in models
+        if child is not model and issubclass(child, model) and not child._meta.proxy
+    ]
+
+    if issubclass(model, Page):
+        # Pages of models that inherit from a listed child are listed under it too
+        excluded = [
+            other
+            for other in apps.get_models()
+            if not other._meta.proxy and issubclass(other, tuple(children))
+        ]
+        if excluded:
+            content_types = ContentType.objects.get_for_models(*excluded)
+            queryset = queryset.exclude(
+                content_type_id__in=[
+                    content_type.pk for content_type in content_types.values()
+                ]
+            )
+        return queryset
+
+    for child in children:
+        queryset = queryset.exclude(pk__in=child.objects.values("pk"))
+
+    return queryset
+
+
+def project_queryset(queryset):
+    """Load only the columns the results need, where they are known."""
+
+    fields = get_inventory_fields(queryset.model)
+    if fields is None:
+        return queryset
+    return queryset.only(*fields)
+
+
+def get_inventory_fields(model):
+    """Return the names of the fields ResultsModelItem needs for a model.
+
+    That's the primary key, the title field from default_field_identifier() and,
+    for pages, the url_path. Returns None, to load every field, when the edit url,
+    title or url may need other fields."""
+
+    pk = model._meta.pk
+    fields = [pk.name]
+    while pk.is_relation:
+        pk = pk.target_field
+    if not isinstance(pk, IntegerField) or get_edit_url_name(model) is None:
+        return None
+
+    for key in default_field_identifier():
+        if hasattr(model, key):
+            try:
+                fields.append(model._meta.get_field(key).name)
+            except FieldDoesNotExist:
+                return None
+            break
+
+    if issubclass(model, Page):
+        if not PageURLResolver.has_default_urls(model):
+            return None
+        fields.append("url_path")
+    elif hasattr(model, "get_url"):
+        return None
+
+    return fields
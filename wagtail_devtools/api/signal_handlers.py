@@ -0,0 +1,124 @@
+from django.apps import apps
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from wagtail.models import Page, Site
+from wagtail.signals import page_published, page_slug_changed, post_page_move
+
+from wagtail_devtools.api.cache import (
+    bump_model_version,
+    get_api_cache,
+    get_related_models,
+)
+from wagtail_devtools.api.conf import CONFIG_SETTINGS, clear_compiled_config
+from wagtail_devtools.api.helpers import has_admin_url_finder
+from wagtail_devtools.api.manifest import (
+    get_manifest_path,
+    manifest_exists,
+    update_manifest,
+    update_manifest_models,
+    update_manifest_pages,
+)
+
+
+def invalidate_model_results(sender, **kwargs):
+    """Invalidate the cached API results and ETags that can include the saved or
+    deleted object."""
+
+    if get_api_cache() is None:
+        return
+    if sender is not Site and not has_admin_url_finder(sender):
+        # Not part of the API results
+        return
+
+    for model in get_related_models(sender):
+        bump_model_version(model)
+
+
+def invalidate_page_results(sender, instance, **kwargs):
+    """Invalidate the cached API results and ETags of every page model, and of
+    redirects, when a page is moved or its slug changes, as Wagtail rewrites the
+    url paths of its descendants and creates redirects without sending signals."""
+
+    if get_api_cache() is None:
+        return
+    for model in get_related_models(Page):
+        bump_model_version(model)
+    if apps.is_installed("wagtail.contrib.redirects"):
+        from wagtail.contrib.redirects.models import Redirect
+
+        bump_model_version(Redirect)
+
+
+def update_manifest_results(sender, instance, **kwargs):
+    """Update the manifest rows of the saved or deleted object, once committed."""
+
+    if not manifest_exists() or not has_admin_url_finder(sender):
+        return
+
+    path = get_manifest_path()
+    pk = instance.pk
+    transaction.on_commit(lambda: update_manifest(path, sender, pk))
+
+    if sender is Site:
+        # The urls of every page may have changed
+        transaction.on_commit(lambda: update_manifest_pages(path))
+
+
+def update_manifest_descendants(sender, instance, **kwargs):
+    """Update the manifest rows of a page and its descendants, whose url paths
+    Wagtail rewrites without sending signals, once committed.
+
+    The redirects Wagtail creates for the old urls are also made without signals,
+    by the wagtail.contrib.redirects handlers of the same signals, so they are all
+    updated too."""
+
+    if not manifest_exists():
+        return
+
+    path = get_manifest_path()
+    page_path = instance.path
+
+    def update():
+        update_manifest_pages(path, path__startswith=page_path)
+        if apps.is_installed("wagtail.contrib.redirects"):
+            from wagtail.contrib.redirects.models import Redirect
+
+            update_manifest_models(path, [Redirect])
+
+    transaction.on_commit(update)
+
+
+def reset_compiled_config(setting, **kwargs):
+    """Build the configs again when a setting they are built from changes."""
+
+    if setting in CONFIG_SETTINGS:
+        clear_compiled_config()
+
+
+def register_signal_handlers():
+    post_save.connect(invalidate_model_results)
+    post_delete.connect(invalidate_model_results)
+    page_published.connect(invalidate_model_results)
+
+    post_save.connect(update_manifest_results)
+    post_delete.connect(update_manifest_results)
+    page_published.connect(update_manifest_results)
+    if apps.is_installed("wagtail.contrib.redirects"):
+        # Receivers are called in the order they are connected, and the redirects
+        # must be created before the manifest is updated, whatever the order of
+        # INSTALLED_APPS. Connecting a receiver again, when the redirects app is
+        # ready, does nothing.
+        from wagtail.contrib.redirects.signal_handlers import (
+            autocreate_redirects_on_page_move,
+            autocreate_redirects_on_slug_change,
+        )
+
+        page_slug_changed.connect(autocreate_redirects_on_slug_change)
+        post_page_move.connect(autocreate_redirects_on_page_move)
+    page_slug_changed.connect(invalidate_page_results)
+    post_page_move.connect(invalidate_page_results)
+    page_slug_changed.connect(update_manifest_descendants)
+    post_page_move.connect(update_manifest_descendants)
+
+    setting_changed.connect(reset_compiled_config)
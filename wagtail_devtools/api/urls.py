@@ -1,10 +1,23 @@
+from django.conf import settings
 from django.urls import path
 
-from .views import api_view, wagtail_core_apps, wagtail_core_listing_pages
+from . import views
+
+
+if hasattr(settings, "DEVTOOLS_API_ASYNC") and settings.DEVTOOLS_API_ASYNC:
+    # For ASGI, so requests don't hold on to a worker thread
+    api_view = views.api_view_async
+    wagtail_core_apps = views.wagtail_core_apps_async
+    wagtail_core_listing_pages = views.wagtail_core_listing_pages_async
+else:
+    api_view = views.api_view
+    wagtail_core_apps = views.wagtail_core_apps
+    wagtail_core_listing_pages = views.wagtail_core_listing_pages
 
 
 urlpatterns = [
     path("", api_view, name="api_index"),
     path("listing-types/", wagtail_core_listing_pages, name="listing-types"),
     path("wagtail-core-apps/", wagtail_core_apps, name="wagtail-core-apps"),
+    path("model-counts/", views.wagtail_core_model_counts, name="model-counts"),
 ]
@@ -1,14 +1,48 @@
-from django.http import JsonResponse
+import functools
+
+import django
+
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
 from django.urls import reverse
+from django.utils.cache import get_conditional_response, quote_etag
+from django.views.decorators.http import condition
 
 from wagtail_devtools.api.conf import (
-    get_wagtail_core_edit_pages_config,
+    get_request_edit_pages_config,
     get_wagtail_core_listing_pages_config,
+    has_config_filters,
+)
+from wagtail_devtools.api.encoders import dumps, json_response
+from wagtail_devtools.api.etags import (
+    wagtail_core_apps_etag,
+    wagtail_core_listing_pages_etag,
+)
+from wagtail_devtools.api.helpers import (
+    NDJSON_CONTENT_TYPE,
+    STREAM_BATCH_SIZE,
+    get_host,
+    get_limit,
+    get_sample,
+    init_ret,
+    wants_columnar,
+    wants_ndjson,
+)
+from wagtail_devtools.api.manifest import (
+    get_manifest_path,
+    manifest_exists,
+    read_manifest,
 )
-from wagtail_devtools.api.helpers import get_host
 from wagtail_devtools.api.serializers import (
+    columnar_stream,
+    wagtail_core_apps_paginated_serializer,
+    wagtail_core_apps_sample_serializer,
     wagtail_core_apps_serializer,
+    wagtail_core_apps_serializer_async,
+    wagtail_core_apps_stream,
     wagtail_core_listing_pages_serializer,
+    wagtail_core_listing_pages_stream,
+    wagtail_core_model_counts_serializer,
 )
 
 
@@ -19,36 +53,250 @@ def api_view(request):
         "api-views": [
             f"{get_host(request)}{reverse('listing-types')}",
             f"{get_host(request)}{reverse('wagtail-core-apps')}",
+            f"{get_host(request)}{reverse('model-counts')}",
         ]
     }
-    return JsonResponse(ret, safe=False)
+    return json_response(ret)
 
 
+def ndjson_response(results):
+    """Stream results as newline delimited JSON, one result per line."""
+    return StreamingHttpResponse(
+        (dumps(result) + b"\n" for result in results),
+        content_type=NDJSON_CONTENT_TYPE,
+    )
+
+
+def columnar_response(request, results, ret):
+    """Stream results in the columnar format, with the meta of ret."""
+    return StreamingHttpResponse(
+        columnar_stream(results, ret["meta"], get_host(request)),
+        content_type="application/json",
+    )
+
+
+@condition(etag_func=wagtail_core_listing_pages_etag)
 def wagtail_core_listing_pages(request):
     """API view for wagtail core listing pages."""
-    return JsonResponse(
+
+    if wants_ndjson(request):
+        return ndjson_response(
+            wagtail_core_listing_pages_stream(
+                request, get_wagtail_core_listing_pages_config()
+            )
+        )
+    return json_response(
         wagtail_core_listing_pages_serializer(
             request,
             get_wagtail_core_listing_pages_config(),
             "Wagtail core listing pages",
-        ),
-        safe=False,
+        )
     )
 
 
+@condition(etag_func=wagtail_core_apps_etag)
 def wagtail_core_apps(request):
-    """API view for wagtail core apps."""
+    """API view for wagtail core apps.
+
+    Pass ?app=, ?model= (as app_label.ModelName) or ?content_type= (an id) to only
+    list those apps and models. Each may be repeated or comma separated.
+
+    Pass ?limit= and/or ?cursor= to page through every object instead of ?all=1,
+    following meta["next"] until it is null.
+
+    Pass ?sample=N to list up to N objects of each model, spread over its primary
+    keys, and ?seed= to choose another sample.
+
+    Pass ?format=columnar to have the results streamed as lists of values, with
+    the strings they share sent once.
+
+    Pass ?format=ndjson, or send an Accept: application/x-ndjson header, to have the
+    results streamed as newline delimited JSON.
+
+    With DEVTOOLS_API_MANIFEST set and the manifest built, unfiltered ?all=1 requests
+    are served from it.
+
+    Responses carry an ETag, so clients can send If-None-Match and get a 304 when
+    nothing has changed."""
+
+    try:
+        config = get_request_edit_pages_config(request)
+    except ValueError as e:
+        return json_response({"error": str(e)}, status=400)
+
+    if request.GET.get("all") and not has_config_filters(request) and manifest_exists():
+        # Serve every object from the manifest rather than the database
+        results = read_manifest(get_manifest_path())
+        if wants_ndjson(request):
+            return ndjson_response(results)
+        if wants_columnar(request):
+            return columnar_response(request, results, init_ret("Wagtail core apps"))
+        ret = init_ret("Wagtail core apps")
+        ret["results"] = list(results)
+        return json_response(ret)
+
+    if request.GET.get("sample"):
+        try:
+            sample, seed = get_sample(request)
+        except ValueError as e:
+            return json_response({"error": str(e)}, status=400)
+        ret = wagtail_core_apps_sample_serializer(
+            request, config, "Wagtail core apps", sample, seed
+        )
+        if wants_ndjson(request):
+            return ndjson_response(ret["results"])
+        if wants_columnar(request):
+            return columnar_response(request, ret["results"], ret)
+        return json_response(ret)
+
+    if wants_ndjson(request):
+        return ndjson_response(
+            wagtail_core_apps_stream(request, config, bool(request.GET.get("all")))
+        )
+
+    if request.GET.get("limit") or request.GET.get("cursor"):
+        try:
+            ret = wagtail_core_apps_paginated_serializer(
+                request,
+                config,
+                "Wagtail core apps",
+                get_limit(request),
+                request.GET.get("cursor"),
+            )
+        except ValueError as e:
+            return json_response({"error": str(e)}, status=400)
+        if wants_columnar(request):
+            return columnar_response(request, ret["results"], ret)
+        return json_response(ret)
+
+    if wants_columnar(request):
+        return columnar_response(
+            request,
+            wagtail_core_apps_stream(request, config, bool(request.GET.get("all"))),
+            init_ret("Wagtail core apps"),
+        )
 
     if not request.GET.get("all"):
-        return JsonResponse(
-            wagtail_core_apps_serializer(
-                request, get_wagtail_core_edit_pages_config(), "Wagtail core apps"
-            ),
-            safe=False,
-        )
-    return JsonResponse(
-        wagtail_core_apps_serializer(
-            request, get_wagtail_core_edit_pages_config(), "Wagtail core apps", True
-        ),
-        safe=False,
+        return json_response(
+            wagtail_core_apps_serializer(request, config, "Wagtail core apps")
+        )
+    return json_response(
+        wagtail_core_apps_serializer(request, config, "Wagtail core apps", True)
+    )
+
+
+def wagtail_core_model_counts(request):
+    """API view for the number of objects of each model in wagtail core apps.
+
+    Takes the same ?app=, ?model= and ?content_type= filters as wagtail_core_apps."""
+
+    try:
+        config = get_request_edit_pages_config(request)
+    except ValueError as e:
+        return json_response({"error": str(e)}, status=400)
+
+    return json_response(
+        wagtail_core_model_counts_serializer(
+            request, config, "Wagtail core apps counts"
+        )
+    )
+
+
+# Async versions of the views, for ASGI, used with DEVTOOLS_API_ASYNC = True
+
+
+def async_condition(etag_func):
+    """condition(etag_func=...) for async views, calling etag_func in a thread as
+    it queries the database."""
+
+    def decorator(view):
+        @functools.wraps(view)
+        async def inner(request, *args, **kwargs):
+            etag = await sync_to_async(etag_func)(request, *args, **kwargs)
+            etag = quote_etag(etag) if etag is not None else None
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+            if etag and request.method in ("GET", "HEAD"):
+                response.headers.setdefault("ETag", etag)
+            return response
+
+        return inner
+
+    return decorator
+
+
+async def aiter_chunks(chunks):
+    """Iterate over chunks, which may be read from the database, taking them in a
+    thread until a batch reaches STREAM_BATCH_SIZE bytes, so that large chunks
+    aren't held back to be joined with others."""
+
+    chunks = iter(chunks)
+
+    def take():
+        batch, size = [], 0
+        for chunk in chunks:
+            batch.append(chunk)
+            size += len(chunk)
+            if size >= STREAM_BATCH_SIZE:
+                break
+        return b"".join(batch)
+
+    take = sync_to_async(take)
+    while batch := await take():
+        yield batch
+
+
+def async_streaming(response):
+    """Have a streaming response read its content asynchronously, rather than
+    Django reading all of it into memory first under ASGI."""
+
+    if response.streaming and django.VERSION >= (4, 2):
+        response.streaming_content = aiter_chunks(response.streaming_content)
+    return response
+
+
+async def api_view_async(request):
+    """Async version of api_view."""
+
+    return await sync_to_async(api_view)(request)
+
+
+@async_condition(etag_func=wagtail_core_listing_pages_etag)
+async def wagtail_core_listing_pages_async(request):
+    """Async version of wagtail_core_listing_pages."""
+
+    view = wagtail_core_listing_pages.__wrapped__
+    return async_streaming(await sync_to_async(view)(request))
+
+
+@async_condition(etag_func=wagtail_core_apps_etag)
+async def wagtail_core_apps_async(request):
+    """Async version of wagtail_core_apps.
+
+    The first, or all, objects of each model are read concurrently and awaited
+    together. Paginated, sampled, streamed and manifest responses are made by
+    wagtail_core_apps, in a thread."""
+
+    all = bool(request.GET.get("all"))
+    if (
+        wants_ndjson(request)
+        or wants_columnar(request)
+        or request.GET.get("limit")
+        or request.GET.get("cursor")
+        or request.GET.get("sample")
+        or (all and not has_config_filters(request) and manifest_exists())
+    ):
+        view = wagtail_core_apps.__wrapped__
+        return async_streaming(await sync_to_async(view)(request))
+
+    try:
+        config = await sync_to_async(get_request_edit_pages_config)(request)
+    except ValueError as e:
+        return json_response({"error": str(e)}, status=400)
+
+    return json_response(
+        await wagtail_core_apps_serializer_async(
+            request, config, "Wagtail core apps", all
+        )
     )
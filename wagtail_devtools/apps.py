@@ -5,3 +5,10 @@ class WagtailDevtoolsAppConfig(AppConfig):
     label = "wagtail_devtools"
     name = "wagtail_devtools"
     verbose_name = "Wagtail devtools"
+
+    def ready(self):
+        from wagtail_devtools.api.conf import compile_config
+        from wagtail_devtools.api.signal_handlers import register_signal_handlers
+
+        register_signal_handlers()
+        compile_config()
@@ -1,9 +1,24 @@
+import copy
+import heapq
+import math
+import threading
+import time
+
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from urllib.parse import urljoin, urlparse
+
 import requests
 
 from django.apps import apps
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
 from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from requests.adapters import DEFAULT_POOLSIZE, DEFAULT_RETRIES, HTTPAdapter
 from wagtail.admin.admin_url_finder import AdminURLFinder
 from wagtail.admin.utils import get_admin_base_url
 from wagtail.contrib.modeladmin.helpers import AdminURLHelper
@@ -14,6 +29,15 @@ from wagtail.models import get_page_models
 from wagtail.models.collections import Collection
 from wagtail.snippets.models import get_snippet_models
 
+from wagtail_devtools.api.helpers import STREAM_CHUNK_SIZE
+from wagtail_devtools.api.serializers import project_queryset
+
+from ._report_writers import REPORT_WRITERS
+
+
+# Checks held back per thread of --concurrency, waiting to be reported in order
+PENDING_PER_WORKER = 4
+
 
 class BaseAdminResponsesCommand(BaseCommand):
     """Base command for admin responses commands.
@@ -22,15 +46,45 @@ class BaseAdminResponsesCommand(BaseCommand):
 
     You can specify the URL to check by passing the --host option.
     You can specify the URL to use for the report by passing the --report-url option.
+    You can check several URLs at once by passing the --concurrency option.
+    You can check the site in this process, without a running server, by passing the --in-process option.
+    You can mark URLs slower than a number of milliseconds as warnings by passing the --slow-threshold option.
+    You can write a record of each check as JSON Lines, CSV or JUnit XML by passing the --format and --output options.
+    You can check every object of each model, rather than the first, by passing the --all-objects option and optionally --per-model-limit.
 
     To implement this command in your project, create a management command that extends this class.
 
     Usage:
-        python manage.py [your_command_name] <username> <password> [--host] [--report-url
+        python manage.py [your_command_name] <username> <password> [--host] [--report-url] [--concurrency] [--in-process] [--slow-threshold] [--slowest] [--format] [--output] [--all-objects] [--per-model-limit]
     """
 
     help = "Checks the admin and frontend responses for models including pages, snippets, settings and modeladmin and more."
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.report_lines = []
+        self.reported = set()
+        self.keep_report_lines = True
+        self.checked_url = None
+        self.report_url = None
+        self.slow_threshold = None
+
+        # The structured output, see _report_writers.py
+        self.writer = None
+        self.quiet = False
+        self.check_messages = None
+
+        # The checks in progress, see check_pool()
+        self.concurrency = 1
+        self.executor = None
+        self.pooled_sessions = []
+        self.pending = deque()
+        self.flushing = False
+
+        # The time and size of the responses, by section, see out_timings()
+        self.section = None
+        self.timings = ResponseTimings()
+
     def add_arguments(self, parser):
         parser.add_argument("username", help="The username to use for login")
         parser.add_argument("password", help="The password to use for login")
@@ -41,6 +95,48 @@ class BaseAdminResponsesCommand(BaseCommand):
             "--report-url",
             help="The URL to use for the report. e.g. http://staging.example.com",
         )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=1,
+            help="The number of URLs to check at once. The report is written in the same order",
+        )
+        parser.add_argument(
+            "--in-process",
+            action="store_true",
+            help="Check the site in this process with Django's test client, logged in as the user, rather than over HTTP",
+        )
+        parser.add_argument(
+            "--slow-threshold",
+            type=float,
+            help="Report URLs that take longer than this many milliseconds as warnings",
+        )
+        parser.add_argument(
+            "--slowest",
+            type=int,
+            default=10,
+            help="The number of slowest URLs to list in the summary",
+        )
+        parser.add_argument(
+            "--format",
+            choices=["text", *REPORT_WRITERS],
+            default="text",
+            help="Also write a record of each check as it finishes, as JSON Lines, CSV or JUnit XML",
+        )
+        parser.add_argument(
+            "--output",
+            help="The file to write the records of --format to. Without it they are written in place of the text report",
+        )
+        parser.add_argument(
+            "--all-objects",
+            action="store_true",
+            help="Check every object of each model and every page, rather than the first",
+        )
+        parser.add_argument(
+            "--per-model-limit",
+            type=int,
+            help="With --all-objects, the number of objects of each model to check, in primary key order",
+        )
 
     def handle(self, *args, **options):
         # Disabled if not running in DEBUG mode
@@ -49,28 +145,265 @@ class BaseAdminResponsesCommand(BaseCommand):
                 "This command is only available in DEBUG mode. Set DEBUG=True in your settings to enable it."
             )
 
+        if options["output"] and options["format"] == "text":
+            raise CommandError("--output needs a --format of jsonl, csv or junit.")
+        if options["concurrency"] < 1:
+            raise CommandError("--concurrency must be a positive integer.")
+        if options["per_model_limit"] is not None:
+            if not options["all_objects"]:
+                raise CommandError("--per-model-limit needs --all-objects.")
+            if options["per_model_limit"] < 1:
+                raise CommandError("--per-model-limit must be a positive integer.")
+
         self.report_lines = []
+        self.reported = set()
+        # A line per object would make the report grow with the database
+        self.keep_report_lines = not options["all_objects"]
         self.checked_url = options["host"]
         self.report_url = (
             options["report_url"].strip("/") if options["report_url"] else None
         )
+        self.slow_threshold = options["slow_threshold"]
+        self.timings = ResponseTimings(options["slowest"])
 
-        reports = self.get_reports(*args, **options)
+        with self.report_writer(options["format"], options["output"]):
+            reports = self.get_reports(*args, **options)
 
-        for report in reports:
-            report["function"](*report["args"])
+            with self.check_pool(options["concurrency"]):
+                for report in reports:
+                    report["function"](*report["args"])
 
-    def report_admin_list_pages(self, session, title, url):
-        """Check and report the admin response for a list of pages."""
-        self.out_message(f"\n{title} page ...", "HTTP_INFO")
+            self.out_timings()
+
+    @contextmanager
+    def report_writer(self, format, output=None):
+        """Write a record of each check in format while in this context, to the
+        output file or, in place of the text report, to stdout."""
+
+        if format == "text":
+            yield
+            return
+
+        stream = open(output, "w", encoding="utf-8", newline="") if output else None
+        self.quiet = stream is None
+        self.writer = REPORT_WRITERS[format](stream or self.stdout)
+        try:
+            yield
+        finally:
+            self.writer.close()
+            self.writer = None
+            self.quiet = False
+            if stream is not None:
+                stream.close()
+
+    @contextmanager
+    def check_pool(self, concurrency):
+        """Check URLs on a pool of concurrency threads while in this context.
+
+        Each check is started as soon as it's made, and the messages reporting it,
+        and any written after it, are held back until it's done. The report is
+        written in the same order as checking one URL at a time."""
+
+        self.concurrency = concurrency
+        self.pooled_sessions = []
+        self.pending = deque()
+        self.flushing = False
+
+        if concurrency <= 1:
+            self.executor = None
+            yield
+            return
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            self.executor = executor
+            try:
+                yield
+                self.flush_pending(wait=True)
+            finally:
+                self.executor = None
+                for future, report, url, section in self.pending:
+                    if future is not None:
+                        future.cancel()
+                self.pending.clear()
+
+    def check_url(self, session, url, report=None):
+        """Get url with the session and report the response with report(url,
+        response), out_response() by default."""
+
+        report = report or self.out_response
+
+        if self.executor is None:
+            self.out_check(url, self.timed_get(session, url), report, self.section)
+            return
+
+        self.pool_session(session)
+        future = self.executor.submit(self.timed_get, session, url)
+        self.pending.append((future, report, url, self.section))
+        self.flush_pending()
+
+        # Wait rather than hold back more responses when checks are made faster
+        # than they're done, e.g. with --all-objects, so memory use is bounded
+        while len(self.pending) > self.concurrency * PENDING_PER_WORKER:
+            first = self.pending[0][0]
+            if first is not None:
+                wait([first])
+            self.flush_pending()
+
+    def timed_get(self, session, url):
+        """Get url, attaching the time to the first byte, the total time and the
+        size of the response to it as response.timing."""
+
+        began = time.perf_counter()
+        response = session.get(url, stream=True)
+        ttfb = time.perf_counter() - began
+        size = get_response_size(response)
+        response.timing = {
+            "elapsed": time.perf_counter() - began,
+            "ttfb": ttfb,
+            "size": size,
+        }
+        return response
+
+    def out_check(self, url, response, report, section):
+        self.timings.add(
+            self.get_report_text(url), section, response.status_code, response
+        )
 
-        response = session.get(url)
+        # Collect what report() writes, for the record of the check
+        self.check_messages = []
+        try:
+            report(url, response)
+        finally:
+            messages, self.check_messages = self.check_messages, None
+
+        if self.writer is not None:
+            self.writer.write(self.get_record(url, response, messages, section))
+
+    def get_record(self, url, response, messages, section):
+        styles = {style for message, style in messages}
+        if "ERROR" in styles:
+            result = "error"
+        elif "WARNING" in styles:
+            result = "warning"
+        else:
+            result = "success"
+
+        return {
+            "section": section,
+            "url": self.get_report_text(url),
+            "status": response.status_code,
+            "result": result,
+            "elapsed_ms": round(response.timing["elapsed"] * 1000, 1),
+            "ttfb_ms": round(response.timing["ttfb"] * 1000, 1),
+            "size": response.timing["size"],
+            "message": messages[-1][0] if messages else "",
+        }
+
+    def pool_session(self, session):
+        """Size the session's connection pools to the number of threads, which
+        share its logged in cookies.
+
+        Only the adapters of a new Session are replaced, so that any mounted with
+        retries or TLS settings are kept."""
+
+        if not isinstance(session, requests.Session):
+            return
+        if any(pooled is session for pooled in self.pooled_sessions):
+            return
+        if not has_default_adapters(session):
+            return
+        adapter = HTTPAdapter(
+            pool_connections=self.concurrency, pool_maxsize=self.concurrency
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        self.pooled_sessions.append(session)
+
+    def flush_pending(self, wait=False):
+        """Write out the checks that are done, in the order they were made, up to
+        the first that isn't, or all of them with wait=True."""
+
+        while self.pending:
+            future, report, url, section = self.pending[0]
+            if future is None:
+                # A message written while checks before it were running
+                self.pending.popleft()
+                self.write_message(*report)
+                continue
+            if not wait and not future.done():
+                return
+            self.pending.popleft()
+            self.flushing = True
+            try:
+                self.out_check(url, future.result(), report, section)
+            finally:
+                self.flushing = False
+
+    def out_response(self, url, response):
+        if response.status_code == 200 and self.is_slow(response):
+            self.out_message(f"{url} ← 200 slow {format_ms(response)}", "WARNING")
+        elif response.status_code == 200:
+            self.out_message(f"{url} ← 200", "SUCCESS")
+        else:
+            self.out_message(f"{url} ← {response.status_code}", "ERROR")
 
-        if response.status_code == 200:
+    def out_frontend_response(self, url, response):
+        if response.status_code == 200 and self.is_slow(response):
+            self.out_message(f"{url} ← 200 slow {format_ms(response)}", "WARNING")
+        elif response.status_code == 200:
             self.out_message(f"{url} ← 200", "SUCCESS")
+        elif response.status_code == 404:
+            message = f"{url} ← {response.status_code} probably a draft page"
+            self.out_message(message, "WARNING")
         else:
             self.out_message(f"{url} ← {response.status_code}", "ERROR")
 
+    def is_slow(self, response):
+        timing = getattr(response, "timing", None)
+        if self.slow_threshold is None or timing is None:
+            return False
+        return timing["elapsed"] * 1000 > self.slow_threshold
+
+    def out_timings(self):
+        """Summarize the response times: percentiles, the slowest URLs and the
+        totals of each section."""
+
+        timings = self.timings
+        if not timings.elapsed:
+            return
+
+        self.out_message("\nRESPONSE TIMES ...", "HTTP_INFO")
+
+        elapsed = sorted(timings.elapsed)
+        ttfb = sorted(timings.ttfb)
+        self.out_message(
+            f"{len(elapsed)} URLs, {sum(elapsed):.2f}s, {format_size(timings.size)}"
+        )
+        for name, values in [("total", elapsed), ("first byte", ttfb)]:
+            percentiles = ", ".join(
+                f"p{p} {percentile(values, p) * 1000:.0f}ms" for p in [50, 90, 99]
+            )
+            self.out_message(f"{name}: {percentiles}")
+
+        if timings.slowest_count:
+            self.out_message(f"\nSlowest {timings.slowest_count} URLs:")
+            for seconds, url, size, status in timings.get_slowest():
+                self.out_message(
+                    f"{seconds * 1000:8.0f}ms {format_size(size):>9} {url} ← {status}"
+                )
+
+        self.out_message("\nSections:")
+        for title, (count, total, size) in timings.sections.items():
+            self.out_message(
+                f"{total:8.2f}s {count:4} URLs {format_size(size):>9} {title or 'Other'}"
+            )
+
+    def report_admin_list_pages(self, session, title, url):
+        """Check and report the admin response for a list of pages."""
+        self.out_message(f"\n{title} page ...", "HTTP_INFO")
+
+        self.check_url(session, url)
+
     def report_admin_app_model(self, session, options, title, app_label, model_name):
         """Check and report the admin response for a model."""
         self.out_message(f"\n{title} page ...", "HTTP_INFO")
@@ -100,14 +433,18 @@ class BaseAdminResponsesCommand(BaseCommand):
         self.out_models(session, options, [site_model])
 
     def report_collections(self, session, options):
-        """Check and report the admin response for the collections list page."""
+        """Check and report the admin response for the first collection's edit
+        page, or every collection's with --all-objects."""
         self.out_message("\nCOLLECTIONS EDIT page ...", "HTTP_INFO")
 
-        try:
-            self.out_model(
-                session, options, Collection.objects.first().get_first_child()
-            )
-        except AttributeError:
+        # The root collection has no edit page
+        collections = Collection.objects.filter(depth__gt=1)
+        found = False
+        for collection in self.get_objects(options, Collection, collections):
+            found = True
+            self.check_url(session, self.get_admin_edit_url(options, collection))
+
+        if not found:
             self.out_message("No collections found", "WARNING")
 
     def report_documents(self, session, options):
@@ -153,6 +490,10 @@ class BaseAdminResponsesCommand(BaseCommand):
         """Check and report the admin and frontend responses for all page model types."""
         page_models = self.filter_page_models(get_page_models())
 
+        if options.get("all_objects"):
+            self.report_all_pages(session, options, page_models)
+            return
+
         model_index = []
         results = []
 
@@ -187,65 +528,104 @@ class BaseAdminResponsesCommand(BaseCommand):
             self.out_message(message)
 
             # Check the admin response
-            response = session.get(page["editor_url"])
-            if response.status_code != 200:
-                self.out_message(
-                    f"{page['editor_url']} ← {response.status_code}", "ERROR"
-                )
-            else:
-                self.out_message(f"{page['editor_url']} ← 200", "SUCCESS")
+            self.check_url(session, page["editor_url"])
 
             # Check the frontend response
-            response = session.get(page["url"])
-            if response.status_code == 200:
-                self.out_message(f"{page['url']} ← 200", "SUCCESS")
-            else:
-                if response.status_code == 404:
-                    message = (
-                        f"{page['url']} ← {response.status_code} probably a draft page"
-                    )
-                    self.out_message(message, "WARNING")
-                else:
-                    self.out_message(f"{page['url']} ← {response.status_code}", "ERROR")
+            self.check_url(session, page["url"], self.out_frontend_response)
+
+    def report_all_pages(self, session, options, page_models):
+        """Check and report the admin and frontend responses for every page of the
+        page models, for --all-objects.
+
+        Each model's pages are those of its exact content type, so that pages of a
+        model that inherits from another are only checked once."""
+
+        message = f"\nChecking the admin and frontend responses of every page of {len(page_models)} page types ..."
+        self.out_message(message, "HTTP_INFO")
+
+        for page_model in page_models:
+            pages = page_model.objects.filter(
+                content_type=ContentType.objects.get_for_model(page_model)
+            )
+            for page in self.get_objects(options, page_model, pages):
+                self.out_message(f"\n{page.title} ( {page_model.__name__} ) ↓")
+                self.check_url(session, self.get_admin_edit_url(options, page))
+                if page.url is None:
+                    self.out_message(f"{page.title} has no frontend url", "WARNING")
+                    continue
+                self.check_url(session, page.url, self.out_frontend_response)
 
     def out_models(self, session, options, models):
-        """Create a report for the first object of each model.
-        The models have a base_manager that is used to get the first object."""
+        """Create a report for the first object of each model, or every object with
+        --all-objects. The models have a base_manager that is used to get the objects.
+        """
 
         for model in models:
-            obj = model.objects.first()
-            if not obj:
+            found = False
+            for obj in self.get_objects(options, model):
+                found = True
+                self.check_url(session, self.get_admin_edit_url(options, obj))
+
+            if not found:
                 self.out_message(
                     f"No {model._meta.verbose_name_plural} found", "WARNING"
                 )
-                continue
 
-            url = self.get_admin_edit_url(options, obj)
+    @staticmethod
+    def get_objects(options, model, queryset=None):
+        """Return the first object of a model, or of queryset, in a list or, with
+        --all-objects, an iterator over every object, or those of queryset, up to
+        --per-model-limit.
 
-            response = session.get(url)
+        Every object is read from the database in chunks, in primary key order,
+        loading only the columns the edit and frontend urls need where they are
+        known, so memory use doesn't grow with the size of the table."""
 
-            if response.status_code == 200:
-                self.out_message(f"{url} ← 200", "SUCCESS")
-            else:
-                self.out_message(f"{url} ← {response.status_code}", "ERROR")
+        if queryset is None:
+            queryset = model.objects.all()
+
+        if not options.get("all_objects"):
+            obj = queryset.first()
+            return [obj] if obj else []
+
+        queryset = project_queryset(queryset.order_by("pk"))
+        if options.get("per_model_limit") is not None:
+            queryset = queryset[: options["per_model_limit"]]
+        return queryset.iterator(chunk_size=STREAM_CHUNK_SIZE)
 
     def out_model(self, session, options, model):
         """Create a report for the first object of a model.
         The model does not have a base_manager so the object is passed in."""
         url = self.get_admin_edit_url(options, model)
 
-        response = session.get(url)
-
-        if response.status_code == 200:
-            self.out_message(f"{url} ← 200", "SUCCESS")
-        else:
-            self.out_message(f"{url} ← {response.status_code}", "ERROR")
+        self.check_url(session, url)
 
     def out_message(self, message, style=None):
-        if self.report_url:
-            message = message.replace(self.checked_url, self.report_url)
-        if message not in self.report_lines:
+        if style == "HTTP_INFO":
+            # The section the checks that follow are totalled under
+            self.section = message.strip()
+            if self.section.endswith(" ..."):
+                self.section = self.section[: -len(" ...")]
+        if self.pending and not self.flushing:
+            # Keep the report in order, after the checks still running
+            self.pending.append((None, (message, style), None, None))
+            return
+        self.write_message(message, style)
+
+    def write_message(self, message, style=None):
+        message = self.get_report_text(message)
+        if self.check_messages is not None:
+            self.check_messages.append((message, style))
+        if (
+            self.writer is None
+            and self.keep_report_lines
+            and message not in self.reported
+        ):
+            # Not kept when streaming records, so memory use doesn't grow
+            self.reported.add(message)
             self.report_lines.append(message)
+        if self.quiet:
+            return
         if style and style == "HTTP_INFO":
             self.stdout.write(self.style.HTTP_INFO(message))
             self.stdout.write("=" * len(message))
@@ -258,6 +638,11 @@ class BaseAdminResponsesCommand(BaseCommand):
         else:
             self.stdout.write(message)
 
+    def get_report_text(self, text):
+        if self.report_url:
+            return text.replace(self.checked_url, self.report_url)
+        return text
+
     @staticmethod
     def filter_page_models(page_models):
         """Filter out page models that are not creatable or are in the core apps."""
@@ -281,6 +666,9 @@ class BaseAdminResponsesCommand(BaseCommand):
         return f"{options['host']}{admin_url_finder.get_edit_url(obj)}"
 
     def _log_in(self, options):
+        if options.get("in_process"):
+            return self._log_in_process(options)
+
         with requests.Session() as session:
             url = f"{options['host']}/admin/login/"
 
@@ -326,3 +714,144 @@ class BaseAdminResponsesCommand(BaseCommand):
             else:
                 self.out_message(f"Logged in to {options['host']}", "SUCCESS")
                 return session
+
+    def _log_in_process(self, options):
+        try:
+            user = get_user_model()._default_manager.get_by_natural_key(
+                options["username"]
+            )
+        except get_user_model().DoesNotExist:
+            self.out_message(
+                f"Could not find the user {options['username']}.",
+                "ERROR",
+            )
+            return
+
+        self.out_message(f"Logged in to {options['host']} in process", "SUCCESS")
+        return ClientSession(user)
+
+
+class ClientSession:
+    """Gets URLs from the site in this process with Django's test client, in place
+    of a logged in requests.Session, so no server needs to be running.
+
+    Each thread has its own client with the logged in cookies. Redirects are
+    followed, as requests does, and errors are returned as 500 responses."""
+
+    max_redirects = 30
+    redirect_status_codes = (301, 302, 303, 307, 308)
+
+    def __init__(self, user):
+        client = Client(raise_request_exception=False)
+        client.force_login(user)
+        self.cookies = client.cookies
+        self.local = threading.local()
+        self.local.client = client
+
+    def get_client(self):
+        client = getattr(self.local, "client", None)
+        if client is None:
+            client = Client(raise_request_exception=False)
+            client.cookies = copy.deepcopy(self.cookies)
+            self.local.client = client
+        return client
+
+    def get(self, url, stream=False):
+        client = self.get_client()
+
+        for _ in range(self.max_redirects + 1):
+            parsed = urlparse(url)
+            response = client.get(
+                url,
+                HTTP_HOST=parsed.netloc or "localhost",
+                secure=parsed.scheme == "https",
+            )
+            location = response.get("Location")
+            if response.status_code not in self.redirect_status_codes or not location:
+                break
+            url = urljoin(url, location)
+
+        return response
+
+
+class ResponseTimings:
+    """The response times of the checks, kept compactly: each total and first byte
+    time for the percentiles, the slowest_count slowest URLs and the totals of
+    each section."""
+
+    def __init__(self, slowest_count=10):
+        self.slowest_count = slowest_count
+        # Compact arrays of floats, as there is one of each per URL
+        self.elapsed = array("d")
+        self.ttfb = array("d")
+        self.size = 0
+        self.slowest = []
+        self.sections = {}
+
+    def add(self, url, section, status, response):
+        timing = response.timing
+        self.elapsed.append(timing["elapsed"])
+        self.ttfb.append(timing["ttfb"])
+        self.size += timing["size"]
+
+        totals = self.sections.setdefault(section, [0, 0, 0])
+        totals[0] += 1
+        totals[1] += timing["elapsed"]
+        totals[2] += timing["size"]
+
+        if self.slowest_count:
+            # A min heap, so the fastest of the slowest is replaced
+            entry = (timing["elapsed"], -len(self.elapsed), url, timing["size"], status)
+            if len(self.slowest) < self.slowest_count:
+                heapq.heappush(self.slowest, entry)
+            else:
+                heapq.heappushpop(self.slowest, entry)
+
+    def get_slowest(self):
+        """Return (elapsed, url, size, status) of the slowest URLs, slowest first."""
+
+        return [
+            (elapsed, url, size, status)
+            for elapsed, order, url, size, status in sorted(self.slowest, reverse=True)
+        ]
+
+
+def get_response_size(response):
+    """Return the size of the body of a requests or Django response, reading it."""
+
+    if getattr(response, "streaming", False):
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def has_default_adapters(session):
+    """Return whether a requests session has the adapters of a new Session, rather
+    than any mounted by its creator."""
+
+    if sorted(session.adapters) != ["http://", "https://"]:
+        return False
+    return all(
+        type(adapter) is HTTPAdapter
+        and adapter._pool_connections == DEFAULT_POOLSIZE
+        and adapter._pool_maxsize == DEFAULT_POOLSIZE
+        and adapter.max_retries.total == DEFAULT_RETRIES
+        for adapter in session.adapters.values()
+    )
+
+
+def percentile(values, p):
+    """Return the p-th percentile of sorted values, by the nearest rank."""
+
+    return values[max(math.ceil(p / 100 * len(values)) - 1, 0)]
+
+
+def format_ms(response):
+    return f"{response.timing['elapsed'] * 1000:.0f}ms"
+
+
+def format_size(size):
+    if size < 1024:
+        return f"{size} B"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f} KB"
+    return f"{size / 1024 / 1024:.1f} MB"
@@ -0,0 +1,112 @@
+"""
+Writers for the structured output of the admin responses commands, chosen with
+--format. Each check is written as a record as soon as it's reported, and the
+stream is flushed, so nothing is held in memory and the file can be read while
+the command is running.
+
+A record is a dict of RECORD_FIELDS. The result is "success", "warning" or
+"error", following the style the check was reported in.
+"""
+
+import csv
+import json
+
+from xml.sax.saxutils import escape, quoteattr
+
+
+RECORD_FIELDS = [
+    "section",
+    "url",
+    "status",
+    "result",
+    "elapsed_ms",
+    "ttfb_ms",
+    "size",
+    "message",
+]
+
+
+class JSONLinesWriter:
+    """One JSON object per line."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, record):
+        self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+    def close(self):
+        pass
+
+
+class CSVWriter:
+    """A header row, then a row per record."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.writer = csv.DictWriter(stream, RECORD_FIELDS, lineterminator="\n")
+        self.writer.writeheader()
+
+    def write(self, record):
+        self.writer.writerow(record)
+        self.stream.flush()
+
+    def close(self):
+        pass
+
+
+class JUnitWriter:
+    """JUnit XML, a test suite per section and a test case per URL. Errors are
+    failures and warnings are kept as the test case's output.
+
+    The test suites are written as they are reported, so don't carry counts, which
+    CI tools work out from the test cases."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.section = None
+        self.stream.write('<?xml version="1.0" encoding="UTF-8"?>\n<testsuites>\n')
+
+    def write(self, record):
+        section = record["section"] or "Other"
+        if section != self.section:
+            self.close_suite()
+            self.section = section
+            self.stream.write(f"  <testsuite name={quoteattr(section)}>\n")
+
+        attributes = " ".join(
+            [
+                f"classname={quoteattr(self.section)}",
+                f"name={quoteattr(record['url'])}",
+                f'time="{record["elapsed_ms"] / 1000:.3f}"',
+            ]
+        )
+        self.stream.write(f"    <testcase {attributes}>\n")
+        if record["result"] == "error":
+            self.stream.write(
+                f"      <failure message={quoteattr(record['message'])} "
+                f'type="{record["status"]}"/>\n'
+            )
+        elif record["result"] == "warning":
+            self.stream.write(
+                f"      <system-out>{escape(record['message'])}</system-out>\n"
+            )
+        self.stream.write("    </testcase>\n")
+        self.stream.flush()
+
+    def close_suite(self):
+        if self.section is not None:
+            self.stream.write("  </testsuite>\n")
+
+    def close(self):
+        self.close_suite()
+        self.stream.write("</testsuites>\n")
+        self.stream.flush()
+
+
+REPORT_WRITERS = {
+    "jsonl": JSONLinesWriter,
+    "csv": CSVWriter,
+    "junit": JUnitWriter,
+}
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from wagtail_devtools.api.helpers import get_host
+from wagtail_devtools.api.manifest import build_manifest, get_manifest_path
+
+
+class Command(BaseCommand):
+    """Build the manifest of API results set by DEVTOOLS_API_MANIFEST.
+
+    Once built it is kept up to date as objects are saved, deleted and published,
+    so it only needs building again after changing models or settings.
+
+    Usage:
+        python manage.py build_api_manifest [--path]
+    """
+
+    help = "Write every wagtail-core-apps API result to an SQLite manifest."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            default=get_manifest_path(),
+            help="Where to write the manifest, defaults to DEVTOOLS_API_MANIFEST",
+        )
+
+    def handle(self, *args, **options):
+        if not options["path"]:
+            raise CommandError(
+                "Set DEVTOOLS_API_MANIFEST in your settings, or pass --path, to build the manifest."
+            )
+
+        if get_host() is None:
+            raise CommandError(
+                "Set WAGTAIL_DEVTOOLS_BASE_URL or WAGTAILADMIN_BASE_URL in your settings, for the editor urls in the manifest."
+            )
+
+        count = build_manifest(options["path"])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {count} results to {options['path']}")
+        )
@@ -0,0 +1,67 @@
+import json
+import time
+
+from django.core.management import BaseCommand
+from django.test import RequestFactory
+
+from wagtail_devtools.api.conf import get_wagtail_core_edit_pages_config
+from wagtail_devtools.api.encoders import JSON_BACKENDS, dumps, orjson
+from wagtail_devtools.api.serializers import wagtail_core_apps_serializer
+
+
+class Command(BaseCommand):
+    """Benchmark for the JSON backends of the API.
+
+    Encodes the ?all=1 inventory of the current database, its results repeated
+    --copies times, with each available backend and reports the throughput. Each
+    backend's output is checked to decode to the same data."""
+
+    help = "Time encoding the API inventory with each JSON backend."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--copies",
+            type=int,
+            default=100,
+            help="Repeat the inventory results this many times",
+        )
+        parser.add_argument(
+            "--rounds",
+            type=int,
+            default=5,
+            help="The number of times to encode the payload with each backend",
+        )
+
+    def handle(self, *args, **options):
+        ret = wagtail_core_apps_serializer(
+            RequestFactory().get("/"),
+            get_wagtail_core_edit_pages_config(),
+            "Wagtail core apps",
+            True,
+        )
+        ret["results"] = ret["results"] * options["copies"]
+        self.stdout.write(f"Encoding {len(ret['results'])} results ...")
+
+        expected = None
+        for backend in JSON_BACKENDS:
+            if backend == "orjson" and orjson is None:
+                self.stdout.write(f"{backend:>8}: not installed")
+                continue
+
+            began = time.perf_counter()
+            for _ in range(options["rounds"]):
+                encoded = dumps(ret, backend)
+            elapsed = (time.perf_counter() - began) / options["rounds"]
+
+            decoded = json.loads(encoded)
+            if expected is None:
+                expected = decoded
+            elif decoded != expected:
+                self.stderr.write(f"{backend} output differs from json")
+
+            self.stdout.write(
+                f"{backend:>8}: {elapsed * 1000:8.1f} ms, "
+                f"{len(encoded) / elapsed / 1e6:8.1f} MB/s"
+            )
+
+        self.stdout.write(self.style.SUCCESS("Done."))
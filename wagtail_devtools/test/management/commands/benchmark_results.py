@@ -0,0 +1,67 @@
+import time
+
+from django.core.management import BaseCommand
+
+from wagtail_devtools.api.dataclasses import Results
+
+
+class Command(BaseCommand):
+    """Micro-benchmark for adding items to Results.
+
+    Adds --items results, one in --duplicate-every being a duplicate, and reports the
+    average time per insert for each tenth of the run. The averages should stay flat
+    as the number of results grows."""
+
+    help = "Time inserts into the API Results collection."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--items",
+            type=int,
+            default=1_000_000,
+            help="The number of items to add",
+        )
+        parser.add_argument(
+            "--duplicate-every",
+            type=int,
+            default=10,
+            help="Add a duplicate of the previous item every N items",
+        )
+
+    def handle(self, *args, **options):
+        total = options["items"]
+        duplicate_every = options["duplicate_every"]
+        step = max(total // 10, 1)
+
+        items = [
+            {
+                "title": f"Item {i}",
+                "app_name": "app",
+                "class_name": "Model",
+                "editor_url": f"http://localhost:8000/admin/model/{i}/",
+                "url": None,
+            }
+            for i in range(total)
+        ]
+
+        results = Results()
+        self.stdout.write(f"Adding {total} items ...")
+
+        for start in range(0, total, step):
+            end = start + step
+            batch = items[start:end]
+            began = time.perf_counter()
+            for count, item in enumerate(batch, start):
+                if duplicate_every and count % duplicate_every == 0 and count:
+                    results.add(items[count - 1])
+                results.add(item)
+            elapsed = time.perf_counter() - began
+            self.stdout.write(
+                f"{len(results):>9} results: {elapsed / len(batch) * 1e9:8.0f} ns per insert"
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(results)} results, {results.duplicates} duplicates dropped."
+            )
+        )
@@ -159,3 +159,9 @@ WAGTAILADMIN_BASE_URL = "http://localhost:8000"
 # DEVTOOLS_APPS_EXCLUDE = ["wagtail_devtools.test"]
 # DEVTOOLS_LISTING_EXCLUDE = ["wagtailsearchpromotions:index"]
 # DEVTOOLS_FIELD_IDENTIFIER = ["title", "name", "slug"]
+# DEVTOOLS_API_CACHE = "default"
+# DEVTOOLS_API_CACHE_TIMEOUT = 60 * 60
+# DEVTOOLS_API_WORKERS = 4
+# DEVTOOLS_API_ASYNC = True
+# DEVTOOLS_JSON_BACKEND = "orjson"
+# DEVTOOLS_API_MANIFEST = os.path.join(BASE_DIR, "devtools_manifest.sqlite3")
@@ -0,0 +1,573 @@
+import csv
+import json
+import os
+import tempfile
+import threading
+import time
+
+from io import StringIO
+from types import SimpleNamespace
+from xml.etree import ElementTree
+
+import requests
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from wagtail.models import Collection, Page
+
+from wagtail_devtools.management.commands._base_admin_responses import (
+    PENDING_PER_WORKER,
+    ClientSession,
+    ResponseTimings,
+    percentile,
+)
+from wagtail_devtools.management.commands._report_writers import RECORD_FIELDS
+from wagtail_devtools.test.management.commands.cmd_test_admin_responses import Command
+from wagtail_devtools.test.models import StandardPageOne, TestSnippetOne, TestSnippetTwo
+
+
+class FakeSession:
+    """Answers each url after a delay, slower for earlier urls so that checks
+    finish out of order, and records how many were running at once."""
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.running = 0
+        self.most = 0
+        self.lock = threading.Lock()
+
+    def get(self, url, stream=False):
+        with self.lock:
+            self.running += 1
+            self.most = max(self.most, self.running)
+        time.sleep(0.02 * (len(self.statuses) - list(self.statuses).index(url)))
+        with self.lock:
+            self.running -= 1
+        return SimpleNamespace(status_code=self.statuses[url], content=url.encode())
+
+
+class BarrierSession:
+    """Holds the first requests until parties of them are running at once, which
+    breaks the barrier if they never are, and records how many ran at once."""
+
+    def __init__(self, parties):
+        self.parties = parties
+        self.barrier = threading.Barrier(parties, timeout=5)
+        self.count = 0
+        self.running = 0
+        self.most = 0
+        self.lock = threading.Lock()
+
+    def get(self, url, stream=False):
+        with self.lock:
+            self.count += 1
+            first = self.count <= self.parties
+            self.running += 1
+            self.most = max(self.most, self.running)
+        try:
+            if first:
+                self.barrier.wait()
+        finally:
+            with self.lock:
+                self.running -= 1
+        return SimpleNamespace(status_code=200, content=b"")
+
+
+class AnySession:
+    """Answers any url with a 200, recording the urls in the order they're got."""
+
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.urls = []
+        self.lock = threading.Lock()
+
+    def get(self, url, stream=False):
+        time.sleep(self.delay)
+        with self.lock:
+            self.urls.append(url)
+        return SimpleNamespace(status_code=200, content=b"")
+
+
+class TestAdminResponsesConcurrency(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with StringIO() as _:
+            # Don't want to see the output of the command
+            call_command("build_fixtures", "--clear", stdout=_)
+
+    def get_command(self):
+        return Command(stdout=StringIO(), stderr=StringIO())
+
+    def run_reports(self, concurrency):
+        options = {"host": "http://localhost:8000"}
+        command = self.get_command()
+        statuses = {
+            "http://localhost:8000/admin/": 200,
+            "http://localhost:8000/admin/pages/": 500,
+            "http://localhost:8000/admin/documents/": 200,
+        }
+        for model in [TestSnippetOne, TestSnippetTwo]:
+            url = command.get_admin_edit_url(options, model.objects.first())
+            statuses[url] = 200
+        statuses["http://localhost:8000/missing/"] = 404
+        session = FakeSession(statuses)
+
+        with command.check_pool(concurrency):
+            command.report_admin_list_pages(
+                session, "DASHBOARD", "http://localhost:8000/admin/"
+            )
+            command.report_admin_list_pages(
+                session, "PAGES list", "http://localhost:8000/admin/pages/"
+            )
+            command.report_admin_list_pages(
+                session, "DOCUMENTS list", "http://localhost:8000/admin/documents/"
+            )
+            command.out_models(session, options, [TestSnippetOne, TestSnippetTwo])
+            command.check_url(
+                session,
+                "http://localhost:8000/missing/",
+                command.out_frontend_response,
+            )
+
+        return command, session
+
+    def test_same_report(self):
+        serial, serial_session = self.run_reports(1)
+        concurrent, session = self.run_reports(4)
+
+        self.assertEqual(serial_session.most, 1)
+        self.assertGreater(session.most, 1)
+        self.assertLessEqual(session.most, 4)
+
+        self.assertEqual(concurrent.report_lines, serial.report_lines)
+        self.assertEqual(concurrent.stdout.getvalue(), serial.stdout.getvalue())
+        self.assertEqual(concurrent.stderr.getvalue(), serial.stderr.getvalue())
+        self.assertIn(
+            "http://localhost:8000/admin/pages/ ← 500", serial.stderr.getvalue()
+        )
+        self.assertIn(
+            "http://localhost:8000/missing/ ← 404 probably a draft page",
+            serial.report_lines,
+        )
+
+    def test_pool_session(self):
+        command = self.get_command()
+        session = requests.Session()
+        with command.check_pool(4):
+            command.pool_session(session)
+        self.assertEqual(session.get_adapter("https://example.com")._pool_maxsize, 4)
+
+    def test_pool_session_keeps_mounted_adapters(self):
+        command = self.get_command()
+        session = requests.Session()
+        adapter = HTTPAdapter(max_retries=Retry(total=3))
+        session.mount("https://", adapter)
+        with command.check_pool(4):
+            command.pool_session(session)
+        self.assertIs(session.get_adapter("https://example.com"), adapter)
+
+    @override_settings(DEBUG=True)
+    def test_concurrency_positive(self):
+        for concurrency in ["0", "-1"]:
+            with self.subTest(concurrency=concurrency), self.assertRaisesMessage(
+                CommandError, "--concurrency must be a positive integer."
+            ):
+                call_command(
+                    "cmd_test_admin_responses",
+                    "superuser",
+                    "-",
+                    "--concurrency",
+                    concurrency,
+                )
+
+    def test_requests_overlap(self):
+        # Rather than timing the checks, which is flaky on a busy machine, hold the
+        # first requests until as many as the concurrency are running at once
+        command = self.get_command()
+        session = BarrierSession(4)
+        urls = [f"http://localhost:8000/{i}/" for i in range(8)]
+        with command.check_pool(4):
+            for url in urls:
+                command.check_url(session, url)
+
+        self.assertFalse(session.barrier.broken)
+        self.assertEqual(session.most, 4)
+        self.assertEqual(command.report_lines, [f"{url} ← 200" for url in urls])
+
+
+class TestAdminResponsesTimings(TestCase):
+    def get_command(self, slow_threshold=None):
+        command = Command(stdout=StringIO(), stderr=StringIO())
+        command.slow_threshold = slow_threshold
+        return command
+
+    def run_checks(self, command):
+        session = FakeSession(
+            {
+                "http://localhost:8000/slow/": 200,
+                "http://localhost:8000/error/": 500,
+                "http://localhost:8000/fast/": 200,
+            }
+        )
+        with command.check_pool(1):
+            command.report_admin_list_pages(
+                session, "SLOW list", "http://localhost:8000/slow/"
+            )
+            command.out_message("\nOTHER pages ...", "HTTP_INFO")
+            command.check_url(session, "http://localhost:8000/error/")
+            command.check_url(session, "http://localhost:8000/fast/")
+
+    def get_records(self, command, format="jsonl"):
+        with command.report_writer(format):
+            self.run_checks(command)
+        return command.stdout.getvalue()
+
+    def test_records(self):
+        command = self.get_command()
+        records = [json.loads(line) for line in self.get_records(command).splitlines()]
+
+        self.assertEqual(
+            [(record["url"], record["section"]) for record in records],
+            [
+                ("http://localhost:8000/slow/", "SLOW list page"),
+                ("http://localhost:8000/error/", "OTHER pages"),
+                ("http://localhost:8000/fast/", "OTHER pages"),
+            ],
+        )
+        slow, error, fast = records
+        self.assertEqual(list(slow), RECORD_FIELDS)
+        self.assertEqual(slow["status"], 200)
+        self.assertEqual(slow["result"], "success")
+        self.assertEqual(slow["message"], "http://localhost:8000/slow/ ← 200")
+        self.assertEqual(error["result"], "error")
+        self.assertEqual(slow["size"], len(b"http://localhost:8000/slow/"))
+        self.assertGreaterEqual(slow["elapsed_ms"], 60)
+        self.assertGreater(slow["elapsed_ms"], fast["elapsed_ms"])
+        self.assertLessEqual(slow["ttfb_ms"], slow["elapsed_ms"])
+
+        # Records are written in place of the text report, which isn't kept
+        self.assertEqual(command.stderr.getvalue(), "")
+        self.assertEqual(command.report_lines, [])
+
+    def test_csv(self):
+        rows = list(
+            csv.DictReader(StringIO(self.get_records(self.get_command(), "csv")))
+        )
+        self.assertEqual(
+            [(row["url"], row["status"]) for row in rows],
+            [
+                ("http://localhost:8000/slow/", "200"),
+                ("http://localhost:8000/error/", "500"),
+                ("http://localhost:8000/fast/", "200"),
+            ],
+        )
+
+    def test_junit(self):
+        root = ElementTree.fromstring(self.get_records(self.get_command(), "junit"))
+        suites = root.findall("testsuite")
+        self.assertEqual(
+            [suite.get("name") for suite in suites], ["SLOW list page", "OTHER pages"]
+        )
+        cases = root.findall("testsuite/testcase")
+        self.assertEqual(len(cases), 3)
+        self.assertEqual(cases[1].get("name"), "http://localhost:8000/error/")
+        self.assertEqual(cases[1].find("failure").get("type"), "500")
+        self.assertIsNone(cases[2].find("failure"))
+        self.assertGreater(float(cases[0].get("time")), 0)
+
+    def test_summary(self):
+        command = self.get_command()
+        command.timings = ResponseTimings(slowest_count=1)
+        self.run_checks(command)
+        command.out_timings()
+
+        output = command.stdout.getvalue()
+        self.assertIn("RESPONSE TIMES", output)
+        self.assertIn("3 URLs", output)
+        self.assertRegex(output, r"total: p50 \d+ms, p90 \d+ms, p99 \d+ms")
+        self.assertRegex(output, r"first byte: p50 \d+ms")
+        self.assertRegex(
+            output, r"Slowest 1 URLs:\n +\d+ms .* http://localhost:8000/slow/ ← 200\n"
+        )
+        self.assertNotIn("fast/ ← 200\n\nSections", output)
+        self.assertRegex(output, r"1 URLs .* SLOW list page")
+        self.assertRegex(output, r"2 URLs .* OTHER pages")
+
+    def test_slowest(self):
+        timings = ResponseTimings(slowest_count=3)
+        for i, elapsed in enumerate([0.5, 0.1, 0.9, 0.3, 0.9, 0.2]):
+            response = SimpleNamespace(
+                timing={"elapsed": elapsed, "ttfb": elapsed, "size": i}
+            )
+            timings.add(f"/{i}/", "section", 200, response)
+        self.assertEqual(
+            [url for elapsed, url, size, status in timings.get_slowest()],
+            ["/2/", "/4/", "/0/"],
+        )
+        self.assertEqual(len(timings.elapsed), 6)
+        self.assertEqual(timings.sections["section"][0], 6)
+
+    def test_slow_threshold(self):
+        command = self.get_command(slow_threshold=50)
+        self.run_checks(command)
+        messages = command.report_lines
+        self.assertTrue(
+            any(
+                message.startswith("http://localhost:8000/slow/ ← 200 slow ")
+                for message in messages
+            )
+        )
+        self.assertIn("http://localhost:8000/fast/ ← 200", messages)
+        self.assertIn("http://localhost:8000/error/ ← 500", messages)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 90), 7)
+
+
+@override_settings(DEBUG=True)
+class TestAdminResponsesInProcess(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with StringIO() as _:
+            # Don't want to see the output of the command
+            call_command("build_fixtures", "--clear", stdout=_)
+
+    def call_command(self, *args):
+        stdout, stderr = StringIO(), StringIO()
+        # The 404 and 500 frontend pages are logged, as by a server
+        with self.assertLogs("django.request", "WARNING"):
+            call_command(
+                "cmd_test_admin_responses",
+                "superuser",
+                "not-checked",
+                "--in-process",
+                *args,
+                stdout=stdout,
+                stderr=stderr,
+            )
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_report(self):
+        stdout, stderr = self.call_command()
+        self.assertIn("Logged in to http://localhost:8000 in process", stdout)
+        self.assertIn(
+            f"http://localhost:8000{reverse('wagtailadmin_home')} ← 200", stdout
+        )
+        self.assertIn("http://localhost:8000/frontend-page-200/ ← 200", stdout)
+        self.assertIn(
+            "http://localhost:8000/frontend-page-404/ ← 404 probably a draft page",
+            stdout,
+        )
+        self.assertIn("http://localhost:8000/frontend-page-500/ ← 500", stderr)
+        self.assertIn("http://localhost:8000/frontend-page-302/ ← 302", stderr)
+        self.assertNotIn("Could not", stdout + stderr)
+
+    def test_format(self):
+        stdout, stderr = self.call_command("--format", "jsonl")
+        records = [json.loads(line) for line in stdout.splitlines()]
+        self.assertEqual(stderr, "")
+        self.assertIn(
+            {"url": "http://localhost:8000/frontend-page-500/", "result": "error"},
+            [{"url": r["url"], "result": r["result"]} for r in records],
+        )
+
+    def test_output(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "report.xml")
+            stdout, stderr = self.call_command("--format", "junit", "--output", path)
+            root = ElementTree.parse(path).getroot()
+        cases = root.findall("testsuite/testcase")
+        self.assertIn(f"\n{len(cases)} URLs, ", stdout)
+
+    def test_output_needs_format(self):
+        with self.assertRaises(CommandError):
+            call_command(
+                "cmd_test_admin_responses", "superuser", "-", "--output", "report.txt"
+            )
+
+    def test_unknown_user(self):
+        command = Command(stdout=StringIO(), stderr=StringIO())
+        session = command._log_in(
+            {"username": "nobody", "host": "http://localhost:8000", "in_process": True}
+        )
+        self.assertIsNone(session)
+        self.assertIn("Could not find the user nobody.", command.report_lines)
+
+    def test_follows_redirects(self):
+        session = ClientSession(get_user_model().objects.get(username="superuser"))
+        response = session.get("http://localhost:8000/admin")
+        self.assertEqual(response.status_code, 200)
+        with self.assertLogs("django.request", "WARNING"):
+            response = session.get("http://localhost:8000/cms/")
+        self.assertEqual(response.status_code, 404)
+
+
+class TestAdminResponsesAllObjects(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with StringIO() as _:
+            # Don't want to see the output of the command
+            call_command("build_fixtures", "--clear", stdout=_)
+        for i in range(5):
+            TestSnippetOne.objects.create(title=f"Extra snippet {i}")
+
+    def get_command(self):
+        return Command(stdout=StringIO(), stderr=StringIO())
+
+    def check_models(self, options, concurrency=1):
+        command = self.get_command()
+        session = AnySession()
+        with command.check_pool(concurrency):
+            command.out_models(session, options, [TestSnippetOne])
+        return command, session
+
+    def get_edit_urls(self, command, options, objects):
+        return [command.get_admin_edit_url(options, obj) for obj in objects]
+
+    def test_first_object(self):
+        options = {"host": "http://localhost:8000"}
+        command, session = self.check_models(options)
+        self.assertEqual(
+            session.urls,
+            self.get_edit_urls(command, options, [TestSnippetOne.objects.first()]),
+        )
+
+    def test_all_objects(self):
+        options = {"host": "http://localhost:8000", "all_objects": True}
+        command, session = self.check_models(options, concurrency=4)
+        self.assertEqual(
+            sorted(session.urls),
+            sorted(
+                self.get_edit_urls(
+                    command, options, TestSnippetOne.objects.order_by("pk")
+                )
+            ),
+        )
+        self.assertGreater(len(session.urls), 5)
+
+    def test_collections(self):
+        root = Collection.get_first_root_node()
+        for i in range(3):
+            root.add_child(name=f"Extra collection {i}")
+        collections = Collection.objects.filter(depth__gt=1).order_by("pk")
+
+        for options, expected in [
+            ({"host": "http://localhost:8000"}, [collections.order_by("path")[0]]),
+            ({"host": "http://localhost:8000", "all_objects": True}, collections),
+        ]:
+            with self.subTest(options=options):
+                command = self.get_command()
+                session = AnySession()
+                with command.check_pool(1):
+                    command.report_collections(session, options)
+                self.assertEqual(
+                    session.urls, self.get_edit_urls(command, options, expected)
+                )
+        self.assertGreater(len(collections), 3)
+
+    def test_per_model_limit(self):
+        options = {
+            "host": "http://localhost:8000",
+            "all_objects": True,
+            "per_model_limit": 3,
+        }
+        command, session = self.check_models(options)
+        self.assertEqual(
+            session.urls,
+            self.get_edit_urls(
+                command, options, TestSnippetOne.objects.order_by("pk")[:3]
+            ),
+        )
+
+    def test_loads_only_needed_columns(self):
+        options = {"host": "http://localhost:8000", "all_objects": True}
+        pages = list(Command.get_objects(options, StandardPageOne))
+        self.assertIn("search_description", pages[0].get_deferred_fields())
+        with self.assertNumQueries(0):
+            pages[0].title
+            pages[0].url_path
+
+    def test_pending_is_bounded(self):
+        options = {"host": "http://localhost:8000", "all_objects": True}
+        command = self.get_command()
+        session = AnySession(delay=0.01)
+        most = 0
+        check_url = command.check_url
+
+        def counting_check_url(*args, **kwargs):
+            nonlocal most
+            check_url(*args, **kwargs)
+            most = max(most, len(command.pending))
+
+        command.check_url = counting_check_url
+        with command.check_pool(2):
+            command.out_models(session, options, [TestSnippetOne])
+        self.assertLessEqual(most, 2 * PENDING_PER_WORKER)
+        self.assertEqual(len(session.urls), TestSnippetOne.objects.count())
+
+    def test_pages_checked_once(self):
+        # Page is inherited by every page model, StandardPageOne among them
+        options = {"host": "http://localhost:8000", "all_objects": True}
+        command = self.get_command()
+        session = AnySession()
+        with command.check_pool(1):
+            command.report_all_pages(session, options, [Page, StandardPageOne])
+
+        self.assertEqual(len(session.urls), len(set(session.urls)))
+        for page in StandardPageOne.objects.all():
+            self.assertIn(command.get_admin_edit_url(options, page), session.urls)
+        self.assertIn("( StandardPageOne )", command.stdout.getvalue())
+
+    @override_settings(DEBUG=True)
+    def test_per_model_limit_needs_all_objects(self):
+        with self.assertRaisesMessage(CommandError, "--per-model-limit needs"):
+            call_command(
+                "cmd_test_admin_responses",
+                "superuser",
+                "-",
+                "--per-model-limit",
+                "10",
+            )
+
+    @override_settings(DEBUG=True)
+    def test_per_model_limit_positive(self):
+        for limit in ["0", "-1"]:
+            with self.subTest(limit=limit), self.assertRaisesMessage(
+                CommandError, "--per-model-limit must be a positive integer."
+            ):
+                call_command(
+                    "cmd_test_admin_responses",
+                    "superuser",
+                    "-",
+                    "--all-objects",
+                    "--per-model-limit",
+                    limit,
+                )
+
+    @override_settings(DEBUG=True)
+    def test_every_page(self):
+        stdout, stderr = StringIO(), StringIO()
+        with self.assertLogs("django.request", "WARNING"):
+            call_command(
+                "cmd_test_admin_responses",
+                "superuser",
+                "not-checked",
+                "--in-process",
+                "--all-objects",
+                stdout=stdout,
+                stderr=stderr,
+            )
+        output = stdout.getvalue() + stderr.getvalue()
+        self.assertIn("of every page of", output)
+        for snippet in TestSnippetOne.objects.all():
+            self.assertIn(
+                f"{Command.get_admin_edit_url({'host': 'http://localhost:8000'}, snippet)} ← 200",
+                output,
+            )
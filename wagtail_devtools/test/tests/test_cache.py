@@ -0,0 +1,137 @@
+from io import StringIO
+
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from wagtail.models import Page
+
+from wagtail_devtools.api.cache import get_api_cache, get_related_models
+from wagtail_devtools.api.conf import (
+    filter_edit_pages_config,
+    get_wagtail_core_edit_pages_config,
+    get_wagtail_core_listing_pages_config,
+)
+from wagtail_devtools.api.serializers import (
+    wagtail_core_apps_serializer,
+    wagtail_core_listing_pages_serializer,
+)
+from wagtail_devtools.test.models import (
+    HomePage,
+    StandardPageOne,
+    StandardPageTwo,
+    TestSnippetOne,
+    TestSnippetTwo,
+)
+
+
+class TestApiCacheSettings(TestCase):
+    def test_disabled_by_default(self):
+        self.assertIsNone(get_api_cache())
+
+    @override_settings(DEVTOOLS_API_CACHE="default")
+    def test_enabled(self):
+        self.assertIs(get_api_cache(), caches["default"])
+
+    def test_related_models(self):
+        related = get_related_models(HomePage)
+        self.assertIn(HomePage, related)
+        self.assertIn(Page, related)
+        self.assertNotIn(StandardPageOne, related)
+        self.assertIn(StandardPageOne, get_related_models(Page))
+
+
+@override_settings(DEVTOOLS_API_CACHE="default")
+class TestApiCache(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with StringIO() as _:
+            # Don't want to see the output of the command
+            call_command("build_fixtures", "--clear", stdout=_)
+
+    def setUp(self):
+        cache.clear()
+        self.request = RequestFactory().get("/")
+        self.config = get_wagtail_core_edit_pages_config()
+
+    def serialize(self):
+        return wagtail_core_apps_serializer(
+            self.request, self.config, "title", all=True
+        )
+
+    def test_cached(self):
+        with CaptureQueriesContext(connection) as first:
+            uncached = self.serialize()
+        with CaptureQueriesContext(connection) as second:
+            cached = self.serialize()
+        self.assertEqual(cached, uncached)
+        self.assertLess(len(second), len(first) // 4)
+
+    def test_save_invalidates_model(self):
+        self.serialize()
+        snippet = TestSnippetOne.objects.first()
+        snippet.title = "Changed title"
+        snippet.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            ret = self.serialize()
+        titles = [result["title"] for result in ret["results"]]
+        self.assertIn("Changed title", titles)
+
+        tables = " ".join(query["sql"] for query in queries)
+        self.assertIn(TestSnippetOne._meta.db_table, tables)
+        self.assertNotIn(TestSnippetTwo._meta.db_table, tables)
+
+    def test_delete_invalidates_model(self):
+        snippet = TestSnippetOne.objects.create(title="Deleted snippet")
+        titles = [result["title"] for result in self.serialize()["results"]]
+        self.assertIn(snippet.title, titles)
+        snippet.delete()
+        titles = [result["title"] for result in self.serialize()["results"]]
+        self.assertNotIn(snippet.title, titles)
+
+    def test_publish_invalidates_pages(self):
+        self.serialize()
+        page = StandardPageOne.objects.first()
+        page.title = "Published title"
+        page.save_revision().publish()
+        titles = [result["title"] for result in self.serialize()["results"]]
+        self.assertIn("Published title", titles)
+
+    def test_move_invalidates_descendants(self):
+        parent = StandardPageOne.objects.first()
+        parent.add_child(instance=StandardPageTwo(title="Child", slug="child"))
+        target = StandardPageTwo.objects.exclude(slug="child").first()
+        self.serialize()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            parent.move(target, pos="last-child")
+        moved = self.serialize()
+
+        cache.clear()
+        self.assertEqual(moved, self.serialize())
+
+    def test_filtered_models_cached_apart(self):
+        # Listed under Task unless GroupApprovalTask is listed too
+        tasks = wagtail_core_apps_serializer(
+            self.request,
+            filter_edit_pages_config(self.config, model_labels=["wagtailcore.Task"]),
+            "title",
+            all=True,
+        )
+        self.assertEqual(
+            {result["class_name"] for result in tasks["results"]}, {"Task"}
+        )
+        cached = self.serialize()
+        cache.clear()
+        self.assertEqual(cached, self.serialize())
+
+    def test_listing_pages_cached(self):
+        config = get_wagtail_core_listing_pages_config()
+        uncached = wagtail_core_listing_pages_serializer(self.request, config, "title")
+        with self.assertNumQueries(0):
+            cached = wagtail_core_listing_pages_serializer(
+                self.request, config, "title"
+            )
+        self.assertEqual(cached, uncached)
@@ -1,13 +1,27 @@
+import copy
+import os
+import pickle
+import subprocess
+import sys
+
 from io import StringIO
 from unittest.mock import patch
 
 from django.core.management import call_command
 from django.test import SimpleTestCase, TestCase, override_settings
+from wagtail.models import Site
 
 from wagtail_devtools.api.conf import (
+    FrozenDict,
+    filter_edit_pages_config,
+    get_config_key,
+    get_config_models,
+    get_inventory_models,
+    get_listing_urls,
     get_wagtail_core_edit_pages_config,
     get_wagtail_core_listing_pages_config,
 )
+from wagtail_devtools.test.models import HomePage
 
 
 class TestListingConf(SimpleTestCase):
@@ -276,3 +290,109 @@ class TestEditConf(TestCase):
         conf = get_wagtail_core_edit_pages_config()
         for app in conf["apps"]:
             self.assertNotEqual(app["app_name"], "wagtail_devtools")
+
+
+class TestCompiledConf(SimpleTestCase):
+    """Tests for the configs being built once and shared."""
+
+    def test_built_once(self):
+        conf = get_wagtail_core_edit_pages_config()
+        with patch(
+            "wagtail_devtools.api.conf.build_wagtail_core_edit_pages_config"
+        ) as build:
+            self.assertIs(get_wagtail_core_edit_pages_config(), conf)
+        build.assert_not_called()
+        self.assertIs(
+            get_wagtail_core_listing_pages_config(),
+            get_wagtail_core_listing_pages_config(),
+        )
+
+    def test_immutable(self):
+        conf = get_wagtail_core_edit_pages_config()
+        with self.assertRaises(TypeError):
+            conf["title"] = "Changed"
+        with self.assertRaises(TypeError):
+            conf["apps"].append({"app_name": "nope", "models": []})
+        with self.assertRaises(TypeError):
+            conf["apps"][0]["models"].pop()
+        # Can still be copied and pickled
+        copied = copy.deepcopy(conf)
+        self.assertEqual(copied, conf)
+        self.assertEqual(pickle.loads(pickle.dumps(conf)), conf)
+
+    def test_model_classes(self):
+        conf = get_wagtail_core_edit_pages_config()
+        self.assertIn(HomePage, conf.models)
+        with patch("wagtail_devtools.api.conf.apps") as mock_apps:
+            self.assertEqual(get_config_models(conf), conf.models)
+        mock_apps.get_app_config.assert_not_called()
+        self.assertIs(get_inventory_models(conf), get_inventory_models(conf))
+        self.assertEqual(get_config_models(conf), tuple(get_config_models(dict(conf))))
+
+    def test_inventory_models_before_admin_urls(self):
+        # In a new process, before the admin URLconf has been imported and the admin
+        # viewsets have registered their url finders, e.g. in a shell
+        script = "\n".join(
+            [
+                "import django",
+                "django.setup()",
+                "from wagtail.models import Site",
+                "from wagtail_devtools.api.conf import (",
+                "    get_inventory_models, get_wagtail_core_edit_pages_config",
+                ")",
+                "models = get_inventory_models(get_wagtail_core_edit_pages_config())",
+                "print(Site in models)",
+            ]
+        )
+        result = subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", script],
+            capture_output=True,
+            env={
+                **os.environ,
+                "DJANGO_SETTINGS_MODULE": "wagtail_devtools.test.settings",
+            },
+            text=True,
+        )
+        self.assertEqual(result.stdout.strip(), "True", result.stderr)
+        self.assertIn(Site, get_inventory_models(get_wagtail_core_edit_pages_config()))
+
+    def test_setting_changed(self):
+        conf = get_wagtail_core_edit_pages_config()
+        with override_settings(DEVTOOLS_APPS_EXCLUDE=["wagtail_devtools.test"]):
+            excluded = get_wagtail_core_edit_pages_config()
+            self.assertIsNot(excluded, conf)
+            self.assertNotIn(HomePage, excluded.models)
+        self.assertIn(HomePage, get_wagtail_core_edit_pages_config().models)
+
+    def test_filtered(self):
+        conf = filter_edit_pages_config(
+            get_wagtail_core_edit_pages_config(),
+            model_labels=["wagtail_devtools_test.HomePage"],
+        )
+        self.assertIsInstance(conf, FrozenDict)
+        self.assertEqual(conf.models, (HomePage,))
+        self.assertNotEqual(
+            get_config_key(conf), get_config_key(get_wagtail_core_edit_pages_config())
+        )
+
+    def test_listing_urls(self):
+        conf = get_wagtail_core_listing_pages_config()
+        urls, unresolved = get_listing_urls(conf)
+        self.assertEqual(len(urls), len(conf["apps"]))
+        self.assertEqual(unresolved, [])
+        self.assertEqual(urls[0][1], "/admin/searchpicks/")
+        with patch("wagtail_devtools.api.conf.reverse") as reverse:
+            self.assertIs(get_listing_urls(conf)[0], urls)
+        reverse.assert_not_called()
+
+    @patch("wagtail_devtools.api.conf.get_listing_pages_config")
+    def test_listing_urls_unresolved(self, mock_listing_pages_config):
+        mock_listing_pages_config.return_value = [
+            {"title": "Redirects", "app_name": None, "listing_name": "not-a-url"},
+            {"title": "Home", "app_name": None, "listing_name": "wagtailadmin_home"},
+        ]
+        urls, unresolved = get_listing_urls(get_wagtail_core_listing_pages_config())
+        self.assertEqual([path for app, path in urls], ["/admin/"])
+        self.assertEqual(
+            unresolved, [{"title": "Redirects", "listing_name": "not-a-url"}]
+        )
@@ -1,3 +1,6 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import RequestFactory, TestCase, override_settings
 
 from wagtail_devtools.api.dataclasses import (
@@ -108,3 +111,32 @@ class TestResults(TestCase):
                 }
             ],
         )
+
+    def test_results_duplicates(self):
+        results = Results()
+        self.assertTrue(results.add({"editor_url": "/admin/one/"}))
+        self.assertTrue(results.add({"editor_url": "/admin/two/"}))
+        self.assertFalse(results.add({"editor_url": "/admin/one/"}))
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results.duplicates, 1)
+        self.assertTrue(results.is_duplicate({"editor_url": "/admin/two/"}))
+        self.assertEqual(
+            results.get(),
+            [{"editor_url": "/admin/one/"}, {"editor_url": "/admin/two/"}],
+        )
+
+    def test_results_key(self):
+        results = Results(key=lambda item: item["url"])
+        results.add({"editor_url": "/admin/one/", "url": "/"})
+        results.add({"editor_url": "/admin/two/", "url": "/"})
+        self.assertEqual(results.get(), [{"editor_url": "/admin/one/", "url": "/"}])
+        self.assertEqual(results.duplicates, 1)
+
+    def test_results_initial_items(self):
+        results = Results([{"editor_url": "/admin/one/"}])
+        self.assertFalse(results.add({"editor_url": "/admin/one/"}))
+
+    def test_benchmark_results(self):
+        with StringIO() as out:
+            call_command("benchmark_results", "--items", "100", stdout=out)
+            self.assertIn("100 results, 9 duplicates dropped.", out.getvalue())
@@ -0,0 +1,107 @@
+import datetime
+import decimal
+import json
+import uuid
+
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils.translation import gettext_lazy
+
+from wagtail_devtools.api.encoders import dumps, get_json_backend, json_response, orjson
+from wagtail_devtools.api.views import wagtail_core_apps
+from wagtail_devtools.test.models import TestSnippetOne
+
+
+class TestJsonBackend(SimpleTestCase):
+    def test_default(self):
+        self.assertEqual(get_json_backend(), "json")
+
+    @skipUnless(orjson, "orjson isn't installed")
+    @override_settings(DEVTOOLS_JSON_BACKEND="orjson")
+    def test_orjson(self):
+        self.assertEqual(get_json_backend(), "orjson")
+
+    @override_settings(DEVTOOLS_JSON_BACKEND="orjson")
+    def test_falls_back_without_orjson(self):
+        with patch("wagtail_devtools.api.encoders.orjson", None):
+            self.assertEqual(get_json_backend(), "json")
+            self.assertEqual(dumps({"a": 1}), b'{"a": 1}')
+
+    @override_settings(DEVTOOLS_JSON_BACKEND="nope")
+    def test_invalid(self):
+        with self.assertRaises(ImproperlyConfigured):
+            get_json_backend()
+
+    @skipUnless(orjson, "orjson isn't installed")
+    def test_same_data(self):
+        data = {
+            "title": "Café",
+            "lazy": gettext_lazy("Title"),
+            "datetime": datetime.datetime(2023, 11, 4, 12, 30, 15, 123456),
+            "date": datetime.date(2023, 11, 4),
+            "decimal": decimal.Decimal("1.50"),
+            "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            "results": [None, 1, 2.5, True],
+        }
+        self.assertEqual(
+            json.loads(dumps(data, "orjson")), json.loads(dumps(data, "json"))
+        )
+
+    @skipUnless(orjson, "orjson isn't installed")
+    def test_different_bytes(self):
+        self.assertEqual(dumps({"title": "Café"}, "json"), b'{"title": "Caf\\u00e9"}')
+        self.assertEqual(
+            dumps({"title": "Café"}, "orjson"), '{"title":"Café"}'.encode()
+        )
+        self.assertEqual(dumps(1e16, "json"), b"1e+16")
+        self.assertEqual(dumps(1e16, "orjson"), b"1e16")
+
+    @skipUnless(orjson, "orjson isn't installed")
+    @override_settings(DEVTOOLS_JSON_BACKEND="orjson")
+    def test_json_response(self):
+        response = json_response({"error": "nope"}, status=400)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(response.content, b'{"error":"nope"}')
+
+
+class TestJsonBackendViews(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with StringIO() as _:
+            # Don't want to see the output of the command
+            call_command("build_fixtures", "--clear", stdout=_)
+
+    @skipUnless(orjson, "orjson isn't installed")
+    def test_views_same_data(self):
+        TestSnippetOne.objects.update(title="Café ☕ 東京")
+        for params in [{}, {"all": 1}, {"all": 1, "format": "columnar"}]:
+            responses = []
+            for backend in ["json", "orjson"]:
+                with override_settings(DEVTOOLS_JSON_BACKEND=backend):
+                    response = wagtail_core_apps(RequestFactory().get("/", params))
+                if response.streaming:
+                    responses.append(json.loads(b"".join(response.streaming_content)))
+                else:
+                    responses.append(json.loads(response.content))
+            self.assertEqual(responses[0], responses[1])
+            self.assertIn("Café ☕ 東京", json.dumps(responses[0], ensure_ascii=False))
+
+    @skipUnless(orjson, "orjson isn't installed")
+    def test_views_etag(self):
+        etags = []
+        for backend in ["json", "orjson"]:
+            with override_settings(DEVTOOLS_JSON_BACKEND=backend):
+                etags.append(wagtail_core_apps(RequestFactory().get("/"))["ETag"])
+        self.assertNotEqual(etags[0], etags[1])
+
+    def test_benchmark_json(self):
+        with StringIO() as out:
+            call_command("benchmark_json", "--copies", "2", "--rounds", "1", stdout=out)
+            self.assertIn("json:", out.getvalue())
+            self.assertIn("Done.", out.getvalue())
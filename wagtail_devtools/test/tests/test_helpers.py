@@ -1,11 +1,28 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.apps import apps
 from django.conf import settings
+from django.core.management import call_command
 from django.test import RequestFactory, TestCase, override_settings
-from wagtail.models import Page
+from wagtail.admin.admin_url_finder import AdminURLFinder
+from wagtail.models import Page, Site
 
-from wagtail_devtools.api.helpers import get_admin_edit_url, get_host, init_ret
+from wagtail_devtools.api.conf import get_wagtail_core_edit_pages_config
+from wagtail_devtools.api.helpers import (
+    PK_PLACEHOLDER,
+    AdminEditURLResolver,
+    PageURLResolver,
+    SerializationContext,
+    get_admin_edit_url,
+    get_host,
+    init_ret,
+)
+from wagtail_devtools.api.serializers import wagtail_core_apps_serializer
 from wagtail_devtools.test.management.commands.build_fixtures import (
     create_standard_pages,
 )
+from wagtail_devtools.test.models import GenericSettingOne
 
 
 class TestApiHelpers(TestCase):
@@ -57,3 +74,131 @@ class TestApiHelpers(TestCase):
         page_id = page.id
         url = get_admin_edit_url("http://localhost:8000", page)
         self.assertEqual(url, f"http://localhost:8000/admin/pages/{page_id}/edit/")
+
+
+class TestAdminEditURLResolver(TestCase):
+    """Test the per-model admin edit URL resolver."""
+
+    @classmethod
+    def setUpTestData(cls):
+        with StringIO() as _:
+            # Don't want to see the output of the command
+            call_command("build_fixtures", "--clear", stdout=_)
+
+    def test_matches_admin_url_finder(self):
+        resolver = AdminEditURLResolver()
+        for model in apps.get_models():
+            for obj in model.objects.all():
+                self.assertEqual(
+                    resolver.get_edit_url(obj),
+                    AdminURLFinder().get_edit_url(obj),
+                )
+
+    def test_builds_template_once_per_model(self):
+        resolver = AdminEditURLResolver()
+        pages = Page.objects.all()
+        with patch("wagtail_devtools.api.helpers.reverse") as mock_reverse:
+            mock_reverse.return_value = f"/admin/pages/{PK_PLACEHOLDER}/edit/"
+            urls = [resolver.get_edit_url(page) for page in pages]
+        self.assertEqual(mock_reverse.call_count, 1)
+        self.assertEqual(urls, [f"/admin/pages/{page.pk}/edit/" for page in pages])
+
+    def test_falls_back_to_finder(self):
+        resolver = AdminEditURLResolver()
+        setting = GenericSettingOne.objects.first()
+        self.assertIsNone(resolver._get_template(setting))
+        self.assertEqual(
+            resolver.get_edit_url(setting), AdminURLFinder().get_edit_url(setting)
+        )
+
+    def test_none(self):
+        resolver = AdminEditURLResolver()
+        self.assertIsNone(resolver.get_edit_url(None))
+
+
+class TestPageURLResolver(TestCase):
+    """Test resolving page urls from the site root paths."""
+
+    @classmethod
+    def setUpTestData(cls):
+        with StringIO() as _:
+            # Don't want to see the output of the command
+            call_command("build_fixtures", "--clear", stdout=_)
+
+    def test_matches_get_url(self):
+        resolver = PageURLResolver()
+        self.assertEqual(resolver.num_sites, 2)
+        pages = list(Page.objects.specific())
+        with self.assertNumQueries(0):
+            urls = [resolver.get_url(page) for page in pages]
+        self.assertEqual(urls, [page.get_url() for page in pages])
+
+    def test_single_site(self):
+        Site.objects.exclude(is_default_site=True).delete()
+        Site.clear_site_root_paths_cache()
+        resolver = PageURLResolver()
+        for page in Page.objects.all():
+            self.assertEqual(resolver.get_url(page), page.get_url())
+
+    @override_settings(WAGTAIL_I18N_ENABLED=True)
+    def test_falls_back_to_get_url(self):
+        resolver = PageURLResolver()
+        page = Page.objects.get(slug="home")
+        with patch.object(Page, "get_url", return_value="/custom/") as get_url:
+            self.assertEqual(resolver.get_url(page), "/custom/")
+        get_url.assert_called_once()
+
+
+class TestSerializationContext(TestCase):
+    """Test the per-request serialization context."""
+
+    @classmethod
+    def setUpTestData(cls):
+        with StringIO() as _:
+            # Don't want to see the output of the command
+            call_command("build_fixtures", "--clear", stdout=_)
+
+    def test_host_once_per_request(self):
+        request = RequestFactory().get("/")
+        with patch(
+            "wagtail_devtools.api.helpers.get_host", wraps=get_host
+        ) as mock_get_host:
+            wagtail_core_apps_serializer(
+                request, get_wagtail_core_edit_pages_config(), "title", all=True
+            )
+        mock_get_host.assert_called_once_with(request)
+
+    def test_get_edit_url(self):
+        request = RequestFactory().get("/")
+        context = SerializationContext(request)
+        page = Page.objects.get(slug="home")
+        self.assertEqual(context.host, "http://localhost:8000")
+        self.assertEqual(context.get_edit_url(page), get_admin_edit_url(request, page))
+
+    def test_title_field_once_per_model(self):
+        context = SerializationContext()
+        pages = list(Page.objects.all())
+        self.assertEqual(
+            [context.get_title(page) for page in pages], [page.title for page in pages]
+        )
+        self.assertEqual(context.title_keys, {Page: "title"})
+
+    @override_settings(DEVTOOLS_FIELD_IDENTIFIER=["nope"])
+    def test_title_field_not_found(self):
+        context = SerializationContext()
+        page = Page.objects.first()
+        self.assertEqual(context.get_title(page), "Title Field not found")
+
+    def test_get_url(self):
+        page = Page.objects.get(slug="home").specific
+        self.assertEqual(SerializationContext().get_url(page), page.get_url())
+        context = SerializationContext(page_url_resolver=PageURLResolver())
+        with self.assertNumQueries(0):
+            self.assertEqual(context.get_url(page), page.get_url())
+
+    def test_copy(self):
+        context = SerializationContext(page_url_resolver=PageURLResolver())
+        copy = context.copy()
+        self.assertIsNot(copy.resolver, context.resolver)
+        self.assertIs(copy.page_url_resolver, context.page_url_resolver)
+        self.assertIs(copy.title_keys, context.title_keys)
@@ -0,0 +1,175 @@
+import json
+import os
+import shutil
+import tempfile
+
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import CommandError, call_command
+from django.test import RequestFactory, TestCase, override_settings
+from wagtail.models import Site
+
+from wagtail_devtools.api.conf import get_wagtail_core_edit_pages_config
+from wagtail_devtools.api.etags import wagtail_core_apps_etag
+from wagtail_devtools.api.manifest import build_manifest, read_manifest
+from wagtail_devtools.api.serializers import wagtail_core_apps_stream
+from wagtail_devtools.api.views import wagtail_core_apps
+from wagtail_devtools.test.models import (
+    StandardPageOne,
+    StandardPageTwo,
+    TestSnippetOne,
+)
+
+
+class TestManifest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with StringIO() as _:
+            # Don't want to see the output of the command
+            call_command("build_fixtures", "--clear", stdout=_)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "manifest.sqlite3")
+        self.settings = override_settings(DEVTOOLS_API_MANIFEST=self.path)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.directory)
+
+    def get_stream(self):
+        return list(
+            wagtail_core_apps_stream(
+                RequestFactory().get("/"), get_wagtail_core_edit_pages_config(), True
+            )
+        )
+
+    def test_build_manifest(self):
+        count = build_manifest(self.path)
+        results = list(read_manifest(self.path))
+        self.assertEqual(count, len(results))
+        self.assertEqual(results, self.get_stream())
+        self.assertFalse(os.path.exists(f"{self.path}.building"))
+
+    def test_save_updates_manifest(self):
+        build_manifest(self.path)
+        snippet = TestSnippetOne.objects.first()
+        snippet.title = "Changed title"
+        with self.captureOnCommitCallbacks(execute=True):
+            snippet.save()
+        self.assertEqual(list(read_manifest(self.path)), self.get_stream())
+
+    def test_create_and_delete_update_manifest(self):
+        build_manifest(self.path)
+        with self.captureOnCommitCallbacks(execute=True):
+            snippet = TestSnippetOne.objects.create(title="New snippet")
+        self.assertIn(
+            "New snippet", [result["title"] for result in read_manifest(self.path)]
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            snippet.delete()
+        self.assertEqual(list(read_manifest(self.path)), self.get_stream())
+
+    def test_publish_updates_manifest(self):
+        build_manifest(self.path)
+        page = StandardPageOne.objects.first()
+        page.title = "Published title"
+        with self.captureOnCommitCallbacks(execute=True):
+            page.save_revision().publish()
+        self.assertEqual(list(read_manifest(self.path)), self.get_stream())
+
+    def add_grandchild(self):
+        parent = StandardPageOne.objects.first()
+        grandchild = StandardPageTwo(title="Grandchild", slug="grandchild")
+        parent.add_child(instance=grandchild)
+        return parent, grandchild
+
+    def test_slug_change_updates_descendants(self):
+        parent, grandchild = self.add_grandchild()
+        build_manifest(self.path)
+
+        parent.slug = "moved"
+        with self.captureOnCommitCallbacks(execute=True):
+            parent.save_revision().publish()
+
+        grandchild.refresh_from_db()
+        self.assertIn(
+            grandchild.url, [result["url"] for result in read_manifest(self.path)]
+        )
+        self.assertEqual(list(read_manifest(self.path)), self.get_stream())
+
+    def test_move_updates_descendants(self):
+        parent, grandchild = self.add_grandchild()
+        target = StandardPageTwo.objects.exclude(pk=grandchild.pk).first()
+        build_manifest(self.path)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            parent.move(target, pos="last-child")
+
+        grandchild.refresh_from_db()
+        self.assertIn(
+            grandchild.url, [result["url"] for result in read_manifest(self.path)]
+        )
+        self.assertEqual(list(read_manifest(self.path)), self.get_stream())
+
+    def test_site_save_updates_pages(self):
+        build_manifest(self.path)
+        site = Site.objects.get(is_default_site=True)
+        site.hostname = "example.com"
+        with self.captureOnCommitCallbacks(execute=True):
+            site.save()
+
+        self.assertIn(
+            "http://example.com:8000/standard-page-one/",
+            [result["url"] for result in read_manifest(self.path)],
+        )
+        self.assertEqual(list(read_manifest(self.path)), self.get_stream())
+
+    def test_view_serves_manifest(self):
+        build_manifest(self.path)
+        with self.assertNumQueries(0):
+            results = list(read_manifest(self.path))
+
+        request = RequestFactory().get("/", {"all": 1})
+        with self.assertNumQueries(0):
+            data = json.loads(wagtail_core_apps(request).content)
+        self.assertEqual(data["results"], results)
+
+        request = RequestFactory().get("/", {"all": 1, "format": "ndjson"})
+        content = b"".join(wagtail_core_apps(request).streaming_content).decode()
+        self.assertEqual([json.loads(line) for line in content.splitlines()], results)
+
+    def test_etag(self):
+        build_manifest(self.path)
+        request = RequestFactory().get("/", {"all": 1})
+        with self.assertNumQueries(0), patch(
+            "wagtail_devtools.api.etags.get_model_fingerprint"
+        ) as get_model_fingerprint:
+            etag = wagtail_core_apps_etag(request)
+        get_model_fingerprint.assert_not_called()
+
+        snippet = TestSnippetOne.objects.first()
+        snippet.title = "Changed title"
+        os.utime(self.path, ns=(0, 0))
+        with self.captureOnCommitCallbacks(execute=True):
+            snippet.save()
+        self.assertNotEqual(wagtail_core_apps_etag(request), etag)
+
+    def test_command(self):
+        with StringIO() as out:
+            call_command("build_api_manifest", stdout=out)
+            self.assertIn(f"to {self.path}", out.getvalue())
+        self.assertTrue(os.path.exists(self.path))
+
+    @override_settings(DEVTOOLS_API_MANIFEST=None)
+    def test_command_not_configured(self):
+        with self.assertRaises(CommandError):
+            call_command("build_api_manifest")
+
+    @override_settings(WAGTAILADMIN_BASE_URL=None)
+    def test_command_needs_base_url(self):
+        with self.assertRaises(CommandError):
+            call_command("build_api_manifest")
+        self.assertFalse(os.path.exists(self.path))
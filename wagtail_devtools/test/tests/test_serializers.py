@@ -1,19 +1,62 @@
+import asyncio
+import random
+import threading
+import time
+
+from io import StringIO
 from unittest.mock import patch
 
-from django.test import RequestFactory, TestCase
-from wagtail.models import Collection, Group
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_script_prefix, set_script_prefix
+from django.utils import timezone
+from wagtail.models import Collection, Group, Page
 from wagtail.snippets.models import get_snippet_models
 
 from wagtail_devtools.api.conf import (
+    get_inventory_models,
     get_wagtail_core_edit_pages_config,
     get_wagtail_core_listing_pages_config,
 )
-from wagtail_devtools.api.helpers import get_admin_edit_url
+from wagtail_devtools.api.dataclasses import ResultsModelItem
+from wagtail_devtools.api.helpers import (
+    DEFAULT_ASYNC_API_WORKERS,
+    SAMPLE_ROUNDS,
+    PageURLResolver,
+    SerializationContext,
+    amap_models,
+    get_admin_edit_url,
+    map_models,
+)
 from wagtail_devtools.api.serializers import (
+    get_inventory_fields,
+    get_inventory_queryset,
+    get_page_inventory_models,
+    get_page_results,
+    get_sample_pks,
+    make_page,
     wagtail_core_apps_serializer,
+    wagtail_core_apps_serializer_async,
     wagtail_core_listing_pages_serializer,
 )
-from wagtail_devtools.test.models import HomePage
+from wagtail_devtools.test.models import (
+    GenericSettingOne,
+    HomePage,
+    SiteSettingOne,
+    StandardPageOne,
+    TestSnippetOne,
+)
 
 
 class TestWagtailCoreListingPageSerializer(TestCase):
@@ -43,6 +86,24 @@ class TestWagtailCoreListingPageSerializer(TestCase):
         }
         self.assertEqual(ret, expected)
 
+    @patch("wagtail_devtools.api.conf.get_listing_pages_config")
+    def test_unresolved(self, mock_listing_pages_config):
+        mock_listing_pages_config.return_value = [
+            {"title": "Calendar", "app_name": None, "listing_name": "not-a-url"},
+            {"title": "Home", "app_name": None, "listing_name": "wagtailadmin_home"},
+        ]
+        config = get_wagtail_core_listing_pages_config()
+        request = RequestFactory().get("/")
+        ret = wagtail_core_listing_pages_serializer(request, config, "title")
+        self.assertEqual(
+            ret["meta"]["unresolved"],
+            [{"title": "Calendar", "listing_name": "not-a-url"}],
+        )
+        self.assertEqual(
+            [result["editor_url"] for result in ret["results"]],
+            ["http://localhost:8000/admin/"],
+        )
+
 
 class TestWagtailCoreAppsSerializer(TestCase):
     @patch("wagtail_devtools.api.conf.get_wagtail_core_edit_pages_config")
@@ -118,3 +179,314 @@ class TestWagtailCoreAppsSerializer(TestCase):
         self.assertEqual(ret["results"][1]["app_name"], "wagtail_devtools_test")
         self.assertEqual(ret["results"][1]["class_name"], "TestSnippetOne")
         self.assertEqual(ret["results"][1]["editor_url"], snippet_edit_url)
+
+
+class TestInventoryFields(TestCase):
+    def test_page_fields(self):
+        self.assertEqual(
+            get_inventory_fields(StandardPageOne), ["page_ptr", "title", "url_path"]
+        )
+        self.assertEqual(get_inventory_fields(Page), ["id", "title", "url_path"])
+
+    def test_model_fields(self):
+        self.assertEqual(get_inventory_fields(TestSnippetOne), ["id", "title"])
+        self.assertEqual(get_inventory_fields(Collection), ["id", "name"])
+        self.assertEqual(get_inventory_fields(User), ["id", "username"])
+
+    @override_settings(DEVTOOLS_FIELD_IDENTIFIER=["slug", "title"])
+    def test_field_identifier_setting(self):
+        self.assertEqual(
+            get_inventory_fields(StandardPageOne), ["page_ptr", "slug", "url_path"]
+        )
+
+    def test_unknown_fields(self):
+        # The settings edit url is built from other fields
+        self.assertIsNone(get_inventory_fields(GenericSettingOne))
+        self.assertIsNone(get_inventory_fields(SiteSettingOne))
+
+    def test_no_queries_per_object(self):
+        config = get_wagtail_core_edit_pages_config()
+        request = RequestFactory().get("/")
+        TestSnippetOne.objects.create(title="one")
+        # warm up caches, e.g. the site root paths
+        wagtail_core_apps_serializer(request, config, "title", all=True)
+        with CaptureQueriesContext(connection) as before:
+            wagtail_core_apps_serializer(request, config, "title", all=True)
+        TestSnippetOne.objects.bulk_create(
+            [TestSnippetOne(title=f"snippet {i}") for i in range(10)]
+        )
+        with CaptureQueriesContext(connection) as after:
+            ret = wagtail_core_apps_serializer(request, config, "title", all=True)
+        self.assertEqual(len(after), len(before))
+        self.assertIn("snippet 9", [result["title"] for result in ret["results"]])
+
+
+class TestPageResults(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with StringIO() as _:
+            # Don't want to see the output of the command
+            call_command("build_fixtures", "--clear", stdout=_)
+
+    def setUp(self):
+        self.request = RequestFactory().get("/")
+        self.config = get_wagtail_core_edit_pages_config()
+        self.models = get_inventory_models(self.config)
+
+    def test_one_query(self):
+        # warm up caches, e.g. the site root paths
+        wagtail_core_apps_serializer(self.request, self.config, "title", all=True)
+        with CaptureQueriesContext(connection) as queries:
+            ret = wagtail_core_apps_serializer(
+                self.request, self.config, "title", all=True
+            )
+
+        page_queries = [
+            query["sql"]
+            for query in queries
+            if 'FROM "wagtailcore_page" ORDER BY' in query["sql"]
+        ]
+        self.assertEqual(len(page_queries), 1)
+        for model in get_page_inventory_models(self.models):
+            if model is not Page:
+                for query in queries:
+                    self.assertNotIn(f'"{model._meta.db_table}"', query["sql"])
+
+        class_names = [result["class_name"] for result in ret["results"]]
+        self.assertIn("StandardPageOne", class_names)
+        self.assertIn("FormPageOne", class_names)
+
+    def test_matches_model_results(self):
+        page_models = get_page_inventory_models(self.models)
+        context = SerializationContext(
+            self.request, page_url_resolver=PageURLResolver()
+        )
+        page_results = get_page_results(context, self.models, page_models)
+        for model in page_models:
+            expected = [
+                ResultsModelItem(self.request, item).get()
+                for item in get_inventory_queryset(model, self.models).order_by("pk")
+                if get_admin_edit_url(self.request, item)
+            ]
+            self.assertEqual(page_results.get(model._meta.label, []), expected)
+
+    def test_inventory_queryset_without_subqueries(self):
+        for model in get_page_inventory_models(self.models):
+            queryset = get_inventory_queryset(model, self.models)
+            sql = str(queryset.query)
+            self.assertNotIn("SELECT", sql.split("FROM", 1)[1])
+
+            # Each page is listed under its most specific listed model
+            expected = model.objects.all()
+            for child in self.models:
+                if child is not model and issubclass(child, model):
+                    expected = expected.exclude(pk__in=child.objects.values("pk"))
+            self.assertEqual(
+                list(queryset.order_by("pk").values_list("pk", flat=True)),
+                list(expected.order_by("pk").values_list("pk", flat=True)),
+            )
+
+    def test_make_page(self):
+        page = StandardPageOne.objects.first()
+        item = make_page(
+            StandardPageOne, page.pk, {"title": page.title, "url_path": page.url_path}
+        )
+        self.assertIsInstance(item, StandardPageOne)
+        self.assertEqual(item.pk, page.pk)
+        self.assertEqual(item.id, page.pk)
+        self.assertEqual(item.title, page.title)
+        self.assertIn("slug", item.get_deferred_fields())
+
+
+class TestWagtailCoreAppsSerializerWorkers(TransactionTestCase):
+    def test_workers_match_serial(self):
+        with StringIO() as _:
+            # Don't want to see the output of the command
+            call_command("build_fixtures", "--clear", stdout=_)
+
+        config = get_wagtail_core_edit_pages_config()
+        request = RequestFactory().get("/")
+        for all in [False, True]:
+            serial = wagtail_core_apps_serializer(request, config, "title", all)
+            with override_settings(DEVTOOLS_API_WORKERS=4):
+                threaded = wagtail_core_apps_serializer(request, config, "title", all)
+            self.assertEqual(threaded, serial)
+            concurrent = async_to_sync(wagtail_core_apps_serializer_async)(
+                request, config, "title", all
+            )
+            self.assertEqual(concurrent, serial)
+
+
+class TestMapModels(SimpleTestCase):
+    def test_serial_by_default(self):
+        threads = map_models(lambda model: threading.get_ident(), [1, 2, 3])
+        self.assertEqual(set(threads), {threading.get_ident()})
+
+    @override_settings(DEVTOOLS_API_WORKERS=3)
+    def test_threads_keep_order(self):
+        def func(model):
+            time.sleep(0.01 * (5 - model))
+            return model, threading.get_ident(), get_script_prefix()
+
+        set_script_prefix("/prefix/")
+        try:
+            results = map_models(func, [0, 1, 2, 3, 4])
+        finally:
+            set_script_prefix("/")
+
+        self.assertEqual([model for model, _, _ in results], [0, 1, 2, 3, 4])
+        self.assertNotIn(threading.get_ident(), {ident for _, ident, _ in results})
+        self.assertEqual({prefix for _, _, prefix in results}, {"/prefix/"})
+
+    def test_async_keeps_order(self):
+        running, most = 0, 0
+        lock = threading.Lock()
+
+        def func(model):
+            nonlocal running, most
+            with lock:
+                running += 1
+                most = max(most, running)
+            time.sleep(0.01 * (8 - model))
+            with lock:
+                running -= 1
+            return model, get_script_prefix()
+
+        set_script_prefix("/prefix/")
+        try:
+            results = async_to_sync(amap_models)(func, list(range(8)))
+        finally:
+            set_script_prefix("/")
+
+        self.assertEqual([model for model, _ in results], list(range(8)))
+        self.assertEqual({prefix for _, prefix in results}, {"/prefix/"})
+        self.assertGreater(most, 1)
+        self.assertLessEqual(most, DEFAULT_ASYNC_API_WORKERS)
+
+    def test_async_pool_shared(self):
+        def func(model):
+            time.sleep(0.01)
+            return threading.get_ident()
+
+        async def requests():
+            return await asyncio.gather(
+                amap_models(func, list(range(8))), amap_models(func, list(range(8)))
+            )
+
+        first, second = async_to_sync(requests)()
+        # Concurrent requests share the threads rather than each starting a pool
+        self.assertLessEqual(len({*first, *second}), DEFAULT_ASYNC_API_WORKERS)
+
+
+class TestMapModelsConnections(SimpleTestCase):
+    databases = {"default"}
+
+    def query(self, model):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        return threading.get_ident()
+
+    @override_settings(DEVTOOLS_API_WORKERS=2)
+    def test_connections_closed_once(self):
+        with patch.object(
+            type(connections["default"]), "close", autospec=True
+        ) as close:
+            threads = map_models(self.query, list(range(8)))
+
+        # Once per thread, after all the models, rather than after each model
+        closed = [call.args[0] for call in close.call_args_list]
+        self.assertEqual(len(closed), len(set(closed)))
+        self.assertLessEqual(len(closed), 2)
+        self.assertEqual(len(set(threads)), len(closed))
+
+    @override_settings(DEVTOOLS_API_WORKERS=2)
+    def test_async_connections_closed_once(self):
+        with patch.object(
+            type(connections["default"]), "close", autospec=True
+        ) as close:
+            threads = async_to_sync(amap_models)(self.query, list(range(8)))
+
+        closed = [call.args[0] for call in close.call_args_list]
+        self.assertEqual(len(closed), len(set(closed)))
+        self.assertLessEqual(len(closed), 2)
+        self.assertEqual(len(set(threads)), len(closed))
+
+
+class TestSamplePks(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        TestSnippetOne.objects.bulk_create(
+            TestSnippetOne(title=f"Snippet {i}") for i in range(200)
+        )
+        # Leave some gaps in the primary keys
+        TestSnippetOne.objects.filter(pk__in=range(50, 120)).delete()
+
+    def test_sample(self):
+        queryset = TestSnippetOne.objects.all()
+        with CaptureQueriesContext(connection) as queries:
+            pks = get_sample_pks(queryset, 10, random.Random("seed"))
+        self.assertEqual(len(pks), 10)
+        self.assertEqual(pks, sorted(set(pks)))
+        self.assertEqual(queryset.filter(pk__in=pks).count(), 10)
+        # The first primary keys, the highest one, then one lookup per round
+        self.assertLessEqual(len(queries), 2 + SAMPLE_ROUNDS)
+        for query in queries:
+            self.assertNotIn("RANDOM", query["sql"].upper())
+            self.assertNotIn("COUNT", query["sql"].upper())
+            self.assertNotIn("OFFSET", query["sql"].upper())
+
+    def test_large_sample_queries(self):
+        # Sparse primary keys, and more points than are looked up at once
+        TestSnippetOne.objects.bulk_create(
+            TestSnippetOne(pk=pk, title=f"Snippet {pk}")
+            for pk in range(10000, 40000, 7)
+        )
+        queryset = TestSnippetOne.objects.all()
+        with self.assertNumQueries(2 + SAMPLE_ROUNDS):
+            pks = get_sample_pks(queryset, 1000, random.Random("seed"))
+        self.assertEqual(len(pks), 1000)
+        self.assertEqual(pks, sorted(set(pks)))
+        self.assertEqual(queryset.filter(pk__in=pks).count(), 1000)
+        self.assertGreater(pks[-1], 30000)
+
+    def test_spread(self):
+        pks = get_sample_pks(TestSnippetOne.objects.all(), 20, random.Random("seed"))
+        self.assertLess(pks[0], 50)
+        self.assertGreater(pks[-1], 150)
+
+    def test_seeded(self):
+        queryset = TestSnippetOne.objects.all()
+        self.assertEqual(
+            get_sample_pks(queryset, 10, random.Random("seed")),
+            get_sample_pks(queryset, 10, random.Random("seed")),
+        )
+        self.assertNotEqual(
+            get_sample_pks(queryset, 10, random.Random("seed")),
+            get_sample_pks(queryset, 10, random.Random("other")),
+        )
+
+    def test_string_pks(self):
+        Session.objects.bulk_create(
+            Session(
+                session_key=f"key{i:03}",
+                session_data="",
+                expire_date=timezone.now(),
+            )
+            for i in range(100)
+        )
+        queryset = Session.objects.all()
+        with self.assertNumQueries(3):
+            pks = get_sample_pks(queryset, 10, random.Random("seed"))
+        self.assertEqual(len(pks), 10)
+        self.assertEqual(pks, sorted(set(pks)))
+        self.assertEqual(queryset.filter(pk__in=pks).count(), 10)
+        # Drawn from all the objects, as chosen by the seed
+        self.assertGreater(pks[-1], "key050")
+        self.assertNotEqual(pks, get_sample_pks(queryset, 10, random.Random("other")))
+
+    def test_small(self):
+        queryset = TestSnippetOne.objects.filter(pk__lt=5)
+        self.assertEqual(
+            get_sample_pks(queryset, 10, random.Random()),
+            list(queryset.order_by("pk").values_list("pk", flat=True)),
+        )
@@ -1,17 +1,43 @@
+import base64
 import json
 
 from io import StringIO
+from unittest.mock import patch
 
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
 from django.core.management import call_command
-from django.test import RequestFactory, TestCase
+from django.test import RequestFactory, TestCase, override_settings
+from wagtail.models import Page, Site
 
-from wagtail_devtools.api.helpers import get_admin_edit_url
+from wagtail_devtools.api.cache import get_version_key
+from wagtail_devtools.api.conf import (
+    get_inventory_models,
+    get_request_edit_pages_config,
+)
+from wagtail_devtools.api.etags import wagtail_core_apps_etag
+from wagtail_devtools.api.helpers import (
+    STREAM_BATCH_SIZE,
+    encode_cursor,
+    get_admin_edit_url,
+)
+from wagtail_devtools.api.serializers import (
+    columnar_stream,
+    wagtail_core_apps_serializer,
+)
 from wagtail_devtools.api.views import (
+    aiter_chunks,
     api_view,
+    api_view_async,
     wagtail_core_apps,
+    wagtail_core_apps_async,
     wagtail_core_listing_pages,
+    wagtail_core_listing_pages_async,
+    wagtail_core_model_counts,
 )
-from wagtail_devtools.test.models import HomePage
+from wagtail_devtools.test.models import HomePage, TestSnippetOne
 
 
 class TestApiViews(TestCase):
@@ -27,7 +53,7 @@ class TestApiViews(TestCase):
     def test_api_view(self):
         response = api_view(self.request)
         data = json.loads(response.content)["api-views"]
-        self.assertEqual(len(data), 2)
+        self.assertEqual(len(data), 3)
         self.assertEqual(
             data[0],
             "http://localhost:8000/wagtail-devtools-api/listing-types/",
@@ -36,6 +62,10 @@ class TestApiViews(TestCase):
             data[1],
             "http://localhost:8000/wagtail-devtools-api/wagtail-core-apps/",
         )
+        self.assertEqual(
+            data[2],
+            "http://localhost:8000/wagtail-devtools-api/model-counts/",
+        )
 
     def test_wagtail_core_listing_pages(self):
         response = wagtail_core_listing_pages(self.request)
@@ -89,3 +119,532 @@ class TestApiViews(TestCase):
             home_page_editor_url,
         )
         self.assertEqual(data[0]["url"], HomePage.objects.get(slug="home").url)
+
+
+class TestApiViewsSample(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with StringIO() as _:
+            # Don't want to see the output of the command
+            call_command("build_fixtures", "--clear", stdout=_)
+
+    def get_results(self, **params):
+        request = RequestFactory().get("/", params)
+        return json.loads(wagtail_core_apps(request).content)
+
+    def get_inventory(self):
+        # As for pagination, objects are listed under their most specific model
+        request = RequestFactory().get("/", {"all": 1, "format": "ndjson"})
+        response = wagtail_core_apps(request)
+        return [json.loads(line) for line in response.streaming_content]
+
+    def test_sample(self):
+        data = self.get_results(sample=1)
+        self.assertEqual(data["meta"]["sample"], 1)
+        self.assertEqual(data["meta"]["seed"], "0")
+
+        every = self.get_inventory()
+        models = [(result["app_name"], result["class_name"]) for result in every]
+        sampled = [
+            (result["app_name"], result["class_name"]) for result in data["results"]
+        ]
+        self.assertEqual(len(sampled), len(set(sampled)))
+        self.assertEqual(set(sampled), set(models))
+        for result in data["results"]:
+            self.assertIn(result, every)
+
+    def test_seed(self):
+        self.assertEqual(
+            self.get_results(sample=1, seed="a"), self.get_results(sample=1, seed="a")
+        )
+        self.assertEqual(self.get_results(sample=1, seed="b")["meta"]["seed"], "b")
+
+    def test_sample_all(self):
+        every = self.get_inventory()
+        sampled = self.get_results(sample=1000)["results"]
+        self.assertEqual(
+            sorted(result["editor_url"] for result in sampled),
+            sorted(result["editor_url"] for result in every),
+        )
+
+    def test_invalid_sample(self):
+        for sample in ["0", "-1", "ten"]:
+            request = RequestFactory().get("/", {"sample": sample})
+            response = wagtail_core_apps(request)
+            self.assertEqual(response.status_code, 400)
+
+
+class TestApiViewsPagination(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with StringIO() as _:
+            # Don't want to see the output of the command
+            call_command("build_fixtures", "--clear", stdout=_)
+
+    def get_all(self):
+        request = RequestFactory().get("/", {"all": 1})
+        return json.loads(wagtail_core_apps(request).content)["results"]
+
+    def test_pages_cover_all(self):
+        results = []
+        request = RequestFactory().get("/", {"limit": 7})
+        while True:
+            data = json.loads(wagtail_core_apps(request).content)
+            self.assertLessEqual(len(data["results"]), 7)
+            self.assertEqual(data["meta"]["limit"], 7)
+            results += data["results"]
+            if not data["meta"]["next_cursor"]:
+                self.assertIsNone(data["meta"]["next"])
+                break
+            self.assertTrue(data["meta"]["next"].startswith("http://localhost:8000/?"))
+            request = RequestFactory().get(
+                "/", {"limit": 7, "cursor": data["meta"]["next_cursor"]}
+            )
+
+        editor_urls = [result["editor_url"] for result in results]
+        self.assertEqual(len(editor_urls), len(set(editor_urls)))
+        self.assertEqual(
+            sorted(editor_urls),
+            sorted(result["editor_url"] for result in self.get_all()),
+        )
+
+    def test_default_limit(self):
+        cursor = encode_cursor("wagtail_devtools_test", "HomePage", 0)
+        request = RequestFactory().get("/", {"cursor": cursor})
+        data = json.loads(wagtail_core_apps(request).content)
+        self.assertEqual(data["meta"]["limit"], 100)
+        request = RequestFactory().get("/", {"limit": 100000})
+        data = json.loads(wagtail_core_apps(request).content)
+        self.assertEqual(data["meta"]["limit"], 1000)
+        self.assertIsNone(data["meta"]["next_cursor"])
+        self.assertEqual(len(data["results"]), len(self.get_all()))
+
+    def test_invalid_limit(self):
+        for limit in ["0", "-1", "ten"]:
+            request = RequestFactory().get("/", {"limit": limit})
+            response = wagtail_core_apps(request)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("Invalid limit", json.loads(response.content)["error"])
+
+    def test_invalid_cursor(self):
+        cursors = [
+            "not-a-cursor",
+            encode_cursor("nope", "Nope", 1),
+            encode_cursor("wagtail_devtools_test", "TestSnippetOne", "one"),
+        ]
+        for pk in [{"a": 1}, [1], None, True, 1.5]:
+            position = json.dumps(["wagtail_devtools_test", "TestSnippetOne", pk])
+            cursors.append(base64.urlsafe_b64encode(position.encode()).decode())
+
+        for cursor in cursors:
+            request = RequestFactory().get("/", {"cursor": cursor})
+            response = wagtail_core_apps(request)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("Invalid cursor", json.loads(response.content)["error"])
+
+
+class TestApiViewsNdjson(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with StringIO() as _:
+            # Don't want to see the output of the command
+            call_command("build_fixtures", "--clear", stdout=_)
+
+    def get_lines(self, response):
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        content = b"".join(response.streaming_content).decode()
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_wagtail_core_listing_pages(self):
+        request = RequestFactory().get("/", {"format": "ndjson"})
+        lines = self.get_lines(wagtail_core_listing_pages(request))
+        expected = json.loads(
+            wagtail_core_listing_pages(RequestFactory().get("/")).content
+        )["results"]
+        self.assertEqual(lines, expected)
+
+    def test_wagtail_core_apps(self):
+        request = RequestFactory().get("/", HTTP_ACCEPT="application/x-ndjson")
+        lines = self.get_lines(wagtail_core_apps(request))
+        expected = json.loads(wagtail_core_apps(RequestFactory().get("/")).content)[
+            "results"
+        ]
+        self.assertEqual(lines, expected)
+
+    def test_wagtail_core_apps_all(self):
+        request = RequestFactory().get("/", {"format": "ndjson", "all": 1})
+        lines = self.get_lines(wagtail_core_apps(request))
+        expected = json.loads(
+            wagtail_core_apps(RequestFactory().get("/", {"all": 1})).content
+        )["results"]
+        # The same results, in the same order, listed under the same models
+        self.assertEqual(lines, expected)
+        self.assertIn(
+            "GroupApprovalTask", [result["class_name"] for result in expected]
+        )
+
+
+class TestApiViewsConditionalGet(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with StringIO() as _:
+            # Don't want to see the output of the command
+            call_command("build_fixtures", "--clear", stdout=_)
+
+    def test_wagtail_core_apps_not_modified(self):
+        response = wagtail_core_apps(RequestFactory().get("/"))
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+
+        request = RequestFactory().get("/", HTTP_IF_NONE_MATCH=etag)
+        with patch(
+            "wagtail_devtools.api.views.wagtail_core_apps_serializer"
+        ) as serializer:
+            response = wagtail_core_apps(request)
+        self.assertEqual(response.status_code, 304)
+        serializer.assert_not_called()
+
+    def test_wagtail_core_apps_etag_changes(self):
+        etag = wagtail_core_apps(RequestFactory().get("/"))["ETag"]
+        self.assertNotEqual(
+            etag, wagtail_core_apps(RequestFactory().get("/", {"all": 1}))["ETag"]
+        )
+        self.assertNotEqual(
+            etag,
+            wagtail_core_apps(RequestFactory().get("/", {"format": "ndjson"}))["ETag"],
+        )
+
+        TestSnippetOne.objects.create(title="New snippet")
+        request = RequestFactory().get("/", HTTP_IF_NONE_MATCH=etag)
+        response = wagtail_core_apps(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    @override_settings(DEVTOOLS_API_CACHE="default")
+    def test_wagtail_core_apps_etag_changes_on_update(self):
+        # An update in place keeps the row count and highest primary key, so is
+        # only seen through the model versions kept in the API cache
+        etag = wagtail_core_apps(RequestFactory().get("/"))["ETag"]
+        snippet = TestSnippetOne.objects.first()
+        snippet.title = "Changed title"
+        snippet.save()
+
+        request = RequestFactory().get("/", HTTP_IF_NONE_MATCH=etag)
+        response = wagtail_core_apps(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Changed title", response.content)
+
+        etag = response["ETag"]
+        site = Site.objects.get(is_default_site=True)
+        site.hostname = "example.com"
+        site.save()
+
+        request = RequestFactory().get("/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(wagtail_core_apps(request).status_code, 200)
+
+    def test_wagtail_core_apps_etag_queries(self):
+        request = RequestFactory().get("/", {"all": 1})
+        models = get_inventory_models(get_request_edit_pages_config(request))
+        # One aggregate per model, plus one for the sites
+        with self.assertNumQueries(len(models) + 1):
+            wagtail_core_apps_etag(request)
+
+    def test_wagtail_core_apps_etag_without_cache(self):
+        # The default cache isn't written to unless it's the API cache
+        caches["default"].delete(get_version_key(TestSnippetOne))
+        snippet = TestSnippetOne.objects.first()
+        snippet.title = "Changed title"
+        snippet.save()
+        self.assertIsNone(caches["default"].get(get_version_key(TestSnippetOne)))
+
+    def test_wagtail_core_listing_pages_not_modified(self):
+        etag = wagtail_core_listing_pages(RequestFactory().get("/"))["ETag"]
+        request = RequestFactory().get("/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(wagtail_core_listing_pages(request).status_code, 304)
+
+
+class TestApiViewsFilters(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with StringIO() as _:
+            # Don't want to see the output of the command
+            call_command("build_fixtures", "--clear", stdout=_)
+
+    def get_results(self, **params):
+        request = RequestFactory().get("/", {"all": 1, **params})
+        response = wagtail_core_apps(request)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)["results"]
+
+    def test_model(self):
+        results = self.get_results(model="wagtail_devtools_test.TestSnippetOne")
+        self.assertEqual(len(results), TestSnippetOne.objects.count())
+        self.assertEqual(
+            {result["class_name"] for result in results}, {"TestSnippetOne"}
+        )
+
+    def test_model_one_query(self):
+        request = RequestFactory().get(
+            "/", {"all": 1, "model": "wagtail_devtools_test.testsnippetone"}
+        )
+        config = get_request_edit_pages_config(request)
+        with self.assertNumQueries(1):
+            wagtail_core_apps_serializer(request, config, "title", True)
+
+    def test_content_type(self):
+        content_type = ContentType.objects.get_for_model(TestSnippetOne)
+        self.assertEqual(
+            self.get_results(content_type=content_type.pk),
+            self.get_results(model="wagtail_devtools_test.TestSnippetOne"),
+        )
+
+    def test_app(self):
+        results = self.get_results(app="auth")
+        self.assertTrue(results)
+        self.assertEqual({result["app_name"] for result in results}, {"auth"})
+
+    def test_repeated_and_comma_separated(self):
+        models = "wagtail_devtools_test.TestSnippetOne,wagtail_devtools_test.HomePage"
+        results = self.get_results(model=models)
+        self.assertEqual(
+            {result["class_name"] for result in results}, {"TestSnippetOne", "HomePage"}
+        )
+        request = RequestFactory().get("/", {"all": 1, "model": models.split(",")})
+        self.assertEqual(
+            json.loads(wagtail_core_apps(request).content)["results"], results
+        )
+
+    def test_paginated(self):
+        request = RequestFactory().get("/", {"limit": 1000, "app": "auth"})
+        data = json.loads(wagtail_core_apps(request).content)
+        self.assertEqual(data["results"], self.get_results(app="auth"))
+
+    def test_invalid(self):
+        for params in [
+            {"app": "nope"},
+            {"model": "nope.Nope"},
+            {"model": "nope"},
+            {"content_type": "0"},
+            {"content_type": "one"},
+        ]:
+            response = wagtail_core_apps(RequestFactory().get("/", params))
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("Unknown", json.loads(response.content)["error"])
+
+
+class TestApiViewsModelCounts(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with StringIO() as _:
+            # Don't want to see the output of the command
+            call_command("build_fixtures", "--clear", stdout=_)
+
+    def get_counts(self, **params):
+        response = wagtail_core_model_counts(RequestFactory().get("/", params))
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def test_counts(self):
+        data = self.get_counts()
+        counts = {
+            (result["app_name"], result["class_name"]): result["count"]
+            for result in data["results"]
+        }
+        self.assertEqual(
+            counts[("wagtail_devtools_test", "TestSnippetOne")],
+            TestSnippetOne.objects.count(),
+        )
+        self.assertEqual(
+            counts[("wagtail_devtools_test", "HomePage")], HomePage.objects.count()
+        )
+        self.assertEqual(
+            counts[("wagtailcore", "Page")],
+            Page.objects.filter(
+                content_type=ContentType.objects.get_for_model(Page)
+            ).count(),
+        )
+        self.assertEqual(data["meta"]["total"], sum(counts.values()))
+
+    def test_matches_inventory(self):
+        # Every page is counted once, under its most specific model
+        page_counts = [
+            result["count"]
+            for result in self.get_counts()["results"]
+            if issubclass(
+                apps.get_model(result["app_name"], result["class_name"]), Page
+            )
+        ]
+        self.assertEqual(sum(page_counts), Page.objects.count())
+
+    def test_queries(self):
+        ContentType.objects.clear_cache()
+        wagtail_core_model_counts(RequestFactory().get("/"))
+        # One query for the pages and one for all of the other models
+        with self.assertNumQueries(2):
+            wagtail_core_model_counts(RequestFactory().get("/"))
+
+    def test_filters(self):
+        data = self.get_counts(model="wagtail_devtools_test.TestSnippetOne")
+        self.assertEqual(
+            data["results"],
+            [
+                {
+                    "app_name": "wagtail_devtools_test",
+                    "class_name": "TestSnippetOne",
+                    "count": TestSnippetOne.objects.count(),
+                }
+            ],
+        )
+        response = wagtail_core_model_counts(RequestFactory().get("/", {"app": "nope"}))
+        self.assertEqual(response.status_code, 400)
+
+
+class TestApiViewsColumnar(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with StringIO() as _:
+            # Don't want to see the output of the command
+            call_command("build_fixtures", "--clear", stdout=_)
+
+    def get_columnar(self, **params):
+        request = RequestFactory().get("/", {"format": "columnar", **params})
+        response = wagtail_core_apps(request)
+        self.assertEqual(response["Content-Type"], "application/json")
+        return json.loads(b"".join(response.streaming_content))
+
+    def decode(self, data):
+        meta = data["meta"]
+        results = []
+        for row in data["results"]:
+            result = dict(zip(meta["columns"], row))
+            result["app_name"] = data["app_names"][result["app_name"]]
+            result["class_name"] = data["class_names"][result["class_name"]]
+            if result["editor_url"].startswith("/"):
+                result["editor_url"] = meta["host"] + result["editor_url"]
+            results.append(result)
+        return results
+
+    def test_wagtail_core_apps(self):
+        data = self.get_columnar()
+        self.assertEqual(data["meta"]["format"], "columnar")
+        self.assertEqual(data["meta"]["host"], "http://localhost:8000")
+        expected = json.loads(wagtail_core_apps(RequestFactory().get("/")).content)
+        self.assertEqual(self.decode(data), expected["results"])
+
+    def test_wagtail_core_apps_all(self):
+        data = self.get_columnar(all=1)
+        expected = json.loads(
+            wagtail_core_apps(RequestFactory().get("/", {"all": 1})).content
+        )["results"]
+        # The same results, in the same order, listed under the same models
+        self.assertEqual(self.decode(data), expected)
+        self.assertIn("GroupApprovalTask", data["class_names"])
+        self.assertEqual(
+            len(data["class_names"]), len({row[2] for row in data["results"]})
+        )
+
+    def test_smaller(self):
+        request = RequestFactory().get("/", {"all": 1})
+        size = len(wagtail_core_apps(request).content)
+        request = RequestFactory().get("/", {"all": 1, "format": "columnar"})
+        columnar_size = len(b"".join(wagtail_core_apps(request).streaming_content))
+        self.assertLess(columnar_size, size * 0.6)
+
+    def test_paginated(self):
+        data = self.get_columnar(limit=7)
+        self.assertEqual(data["meta"]["limit"], 7)
+        self.assertTrue(data["meta"]["next_cursor"])
+        expected = json.loads(
+            wagtail_core_apps(RequestFactory().get("/", {"limit": 7})).content
+        )
+        self.assertEqual(self.decode(data), expected["results"])
+
+    def test_chunks(self):
+        results = [
+            {
+                "title": f"Item {i}",
+                "app_name": "app",
+                "class_name": "Model",
+                "editor_url": f"http://localhost:8000/admin/{i}/",
+                "url": None,
+            }
+            for i in range(5)
+        ]
+        with patch("wagtail_devtools.api.serializers.STREAM_CHUNK_SIZE", 2):
+            chunks = list(columnar_stream(results, {}, "http://localhost:8000"))
+        data = json.loads(b"".join(chunks))
+        self.assertEqual(len(chunks), 6)
+        self.assertEqual(data["results"][4], ["Item 4", 0, 0, "/admin/4/", None])
+        self.assertEqual(self.decode(data), results)
+
+
+@override_settings(DEVTOOLS_API_WORKERS=1)
+class TestApiViewsAsync(TestCase):
+    # With one worker the async views use the test's database connection, see
+    # TestWagtailCoreAppsSerializerWorkers for the concurrent case
+
+    @classmethod
+    def setUpTestData(cls):
+        with StringIO() as _:
+            # Don't want to see the output of the command
+            call_command("build_fixtures", "--clear", stdout=_)
+
+    def get_content(self, response):
+        async def read():
+            return b"".join([chunk async for chunk in response.streaming_content])
+
+        if not response.streaming:
+            return response.content
+        if response.is_async:
+            return async_to_sync(read)()
+        return b"".join(response.streaming_content)
+
+    def test_views_match(self):
+        for sync_view, async_view, params in [
+            (api_view, api_view_async, {}),
+            (wagtail_core_listing_pages, wagtail_core_listing_pages_async, {}),
+            (wagtail_core_apps, wagtail_core_apps_async, {}),
+            (wagtail_core_apps, wagtail_core_apps_async, {"all": 1}),
+            (wagtail_core_apps, wagtail_core_apps_async, {"app": "auth", "all": 1}),
+            (wagtail_core_apps, wagtail_core_apps_async, {"limit": 7}),
+            (wagtail_core_apps, wagtail_core_apps_async, {"format": "columnar"}),
+        ]:
+            with self.subTest(view=async_view.__name__, params=params):
+                request = RequestFactory().get("/", params)
+                expected = sync_view(request)
+                response = async_to_sync(async_view)(request)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    json.loads(self.get_content(response)),
+                    json.loads(self.get_content(expected)),
+                )
+                self.assertEqual(response.get("ETag"), expected.get("ETag"))
+
+    def test_chunk_batches(self):
+        async def read(chunks):
+            return [batch async for batch in aiter_chunks(chunks)]
+
+        self.assertEqual(async_to_sync(read)([b"a", b"b", b"c"]), [b"abc"])
+        half = b"x" * (STREAM_BATCH_SIZE // 2)
+        self.assertEqual(async_to_sync(read)([half] * 4), [half * 2] * 2)
+        # A large chunk, e.g. of a columnar response, isn't held back
+        large = b"y" * STREAM_BATCH_SIZE * 2
+        self.assertEqual(async_to_sync(read)([large, b"z"]), [large, b"z"])
+
+    def test_ndjson(self):
+        request = RequestFactory().get("/", {"format": "ndjson", "all": 1})
+        expected = b"".join(wagtail_core_apps(request).streaming_content)
+        response = async_to_sync(wagtail_core_apps_async)(request)
+        self.assertTrue(response.is_async)
+        self.assertEqual(self.get_content(response), expected)
+
+    def test_not_modified(self):
+        etag = async_to_sync(wagtail_core_apps_async)(RequestFactory().get("/"))["ETag"]
+        request = RequestFactory().get("/", HTTP_IF_NONE_MATCH=etag)
+        response = async_to_sync(wagtail_core_apps_async)(request)
+        self.assertEqual(response.status_code, 304)
+
+    def test_invalid_filter(self):
+        request = RequestFactory().get("/", {"app": "nope"})
+        response = async_to_sync(wagtail_core_apps_async)(request)
+        self.assertEqual(response.status_code, 400)